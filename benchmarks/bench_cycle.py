@@ -0,0 +1,254 @@
+"""Офлайн-прогін повного циклу periodic_check: канал -> розбір -> різниця
+графіків -> розсилка -> планування й надсилання попереджень, без Telegram і без мережі.
+
+Сторінки t.me/s віддає локальний HTTP-сервер зі збережених фікстур (з ETag і
+?after=), повідомлення приймає фейковий Bot API. Попередження плануються
+справжнім AlertScheduler у фейкову чергу завдань і надсилаються одразу після
+циклу, ніби настав їхній час (лише ті, що лишилися на сьогодні й далі). Кожна популяція користувачів
+запускається в окремому процесі, щоб пік RSS не змішувався між прогонами.
+
+Запуск з кореня репозиторію:
+    python benchmarks/bench_cycle.py [кількості користувачів, за замовчуванням 1000 10000 100000]
+    python benchmarks/bench_cycle.py --users 10000 [--rate 25 --chat-interval 1 --latency 0.05]
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+import threading
+import time
+from datetime import date, timedelta
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+ROOT = Path(__file__).resolve().parent.parent
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+sys.path.insert(0, str(ROOT))
+
+# День, на який записано фікстури: дати постів зсуваються так, щоб він став сьогоднішнім
+FIXTURE_DAY = date(2026, 10, 18)
+EMPTY_PAGE = "<!DOCTYPE html><html><body><main class=\"tgme_main\"></main></body></html>"
+
+def shift_dates(html: str, days: int):
+    """Зсуває час публікації (<time datetime>) і дати 'на ДД.ММ' у тексті постів"""
+    def iso(m):
+        return (date.fromisoformat(m.group(1)) + timedelta(days=days)).isoformat() + "T"
+
+    def short(m):
+        try:
+            day = date(FIXTURE_DAY.year, int(m.group(2)), int(m.group(1))) + timedelta(days=days)
+        except ValueError:
+            return m.group(0)  # Навмисно некоректні дати у фікстурах лишаються як є
+        return f"на {day:%d.%m}"
+
+    html = re.sub(r"(\d{4}-\d{2}-\d{2})T", iso, html)
+    return re.sub(r"на (\d{2})\.(\d{2})", short, html)
+
+def edit_latest(html: str, queue: str = "1.1"):
+    """Зсуває на годину початок першого інтервалу черги в найновішому пості"""
+    head, sep, tail = html.rpartition(f"Черга {queue}: ")
+    tail = re.sub(r"^(\d{2}):", lambda m: f"{(int(m.group(1)) + 1) % 24:02d}:", tail, count=1)
+    return head + sep + tail
+
+# --------- Локальна заміна t.me/s ---------
+
+class ChannelReplay(ThreadingHTTPServer):
+    """Віддає сторінки поточної фази сценарію і рахує запити"""
+
+    daemon_threads = True
+
+    def __init__(self, phases):
+        super().__init__(("127.0.0.1", 0), _ReplayHandler)
+        self.phases = phases  # назва фази -> (повна сторінка, сторінка ?after=)
+        self.phase = None
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def page(self, after: bool):
+        full, newer = self.phases[self.phase]
+        return newer if after else full
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests += 1
+        after = "after" in parse_qs(urlparse(self.path).query)
+        body = self.server.page(after).encode()
+        etag = f'"{hash(body):x}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+# --------- Фейковий Bot API ---------
+
+class FakeBot:
+    """Приймає send_message як Bot, лише рахує; latency імітує мережу до Telegram"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.sent = 0
+
+    async def send_message(self, chat_id, text, **kwargs):
+        await asyncio.sleep(self.latency)
+        self.sent += 1
+
+# --------- Фейкова черга завдань ---------
+
+class ReplayJob:
+    def __init__(self, callback, data):
+        self.callback = callback
+        self.data = data
+        self.removed = False
+
+    def schedule_removal(self):
+        self.removed = True
+
+class ReplayJobQueue:
+    """Приймає run_once як JobQueue; fire_all виконує завдання, не чекаючи їхнього часу"""
+
+    def __init__(self):
+        self.jobs = []
+
+    def run_once(self, callback, when, data=None, name=None):
+        job = ReplayJob(callback, data)
+        self.jobs.append(job)
+        return job
+
+    def pending(self):
+        return sum(not job.removed for job in self.jobs)
+
+    async def fire_all(self):
+        jobs, self.jobs = self.jobs, []
+        for job in jobs:
+            if not job.removed:
+                await job.callback(SimpleNamespace(job=job))
+
+# --------- Один прогін ---------
+
+def build_phases():
+    shift = (date.today() - FIXTURE_DAY).days
+    page = shift_dates((FIXTURES / "channel_page.html").read_text(encoding="utf-8"), shift)
+    newer = shift_dates((FIXTURES / "channel_after.html").read_text(encoding="utf-8"), shift)
+    return {
+        "холодний старт": (page, EMPTY_PAGE),  # усі графіки нові для всіх
+        "без змін": (page, EMPTY_PAGE),        # 304 / порожній ?after=
+        "нові пости": (page, newer),           # два нові дні через ?after=
+        "редагування": (edit_latest(page), EMPTY_PAGE),  # повне перечитування зі зсувом інтервалу
+    }
+
+async def run_cycles(args, server):
+    import bot
+    import data
+    import parser
+    from bench_memory import synthetic_rows
+    from broadcast import Broadcaster
+    from scheduler import AlertScheduler
+
+    data._apply_rows(synthetic_rows(args.users))
+    data.loaded.set()
+
+    fake_bot = FakeBot(args.latency)
+    bot.broadcaster = Broadcaster(fake_bot, workers=args.workers, rate=args.rate, chat_interval=args.chat_interval)
+    bot.broadcaster.start()
+    job_queue = ReplayJobQueue()
+    bot.alert_scheduler = AlertScheduler(job_queue, bot.send_alert)
+    for feed in parser._feeds.values():
+        feed.channel.page = f"http://127.0.0.1:{server.server_address[1]}/s/oblenergo"
+
+    results = []
+    for phase in server.phases:
+        server.phase = phase
+        for feed in parser._feeds.values():
+            # Минув інтервал опитування; для редагування — і інтервал повного перечитування
+            if feed.snapshot is not None:
+                feed.snapshot = feed.snapshot._replace(fetched_at=float("-inf"))
+            if phase == "редагування":
+                feed.channel.full_at = float("-inf")
+
+        requests, sent, notified = server.requests, fake_bot.sent, len(bot.sent_notifications)
+        start = time.perf_counter()
+        await bot.periodic_check(None)
+        cycle = time.perf_counter() - start
+        queued = bot.broadcaster.queue.qsize()
+        scheduled = job_queue.pending()
+        await job_queue.fire_all()
+        await bot.broadcaster.queue.join()
+        drain = time.perf_counter() - start - cycle
+        # Уже надіслані раніше вимкнення send_alert пропускає: рахуються лише доставлені
+        alerts = len(bot.sent_notifications) - notified
+        delivered = fake_bot.sent - sent
+        results.append({
+            "phase": phase,
+            "cycle_ms": cycle * 1000,
+            "fetches": server.requests - requests,
+            "queued": queued,
+            "alerts": alerts,
+            "scheduled": scheduled,
+            "sent": delivered,
+            "msgs_per_s": delivered / drain if delivered and drain > 0 else 0.0,
+        })
+
+    await bot.broadcaster.stop()
+    await parser.close_http_client()
+    return results
+
+def run_once(args):
+    # Бот імпортується вже з налаштуваннями прогону: одне джерело, без HTTP/2
+    os.environ.update({"CHANNEL_URL": "https://t.me/oblenergo", "CHANNEL_SOURCES": "", "HTTP2": "0"})
+    server = ChannelReplay(build_phases())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        results = asyncio.run(run_cycles(args, server))
+    finally:
+        server.shutdown()
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # КіБ -> МіБ (Linux)
+    print(json.dumps({"users": args.users, "peak_rss_mib": peak_rss, "cycles": results}, ensure_ascii=False))
+
+def report(run):
+    print(f"\n👥 {run['users']} користувачів, пік RSS {run['peak_rss_mib']:.1f} МіБ")
+    print(f"{'фаза':<16} {'цикл, мс':>9} {'запитів':>8} {'в черзі':>8} {'заплан.':>8} {'попер.':>7} "
+          f"{'надісл.':>8} {'повід./с':>9}")
+    for c in run["cycles"]:
+        print(f"{c['phase']:<16} {c['cycle_ms']:>9.1f} {c['fetches']:>8} {c['queued']:>8} {c['scheduled']:>8} "
+              f"{c['alerts']:>7} {c['sent']:>8} {c['msgs_per_s']:>9.0f}")
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("sizes", nargs="*", type=int, default=[1000, 10_000, 100_000])
+    arg_parser.add_argument("--users", type=int, help="один прогін у цьому процесі, результат — JSON")
+    # За замовчуванням ліміти Telegram вимкнені: міряється власна пропускна здатність розсилки
+    arg_parser.add_argument("--rate", type=float, default=1e9)
+    arg_parser.add_argument("--chat-interval", type=float, default=0.0)
+    arg_parser.add_argument("--latency", type=float, default=0.0, help="затримка фейкового Bot API, с")
+    arg_parser.add_argument("--workers", type=int, default=8)
+    args = arg_parser.parse_args()
+
+    if args.users is not None:
+        run_once(args)
+        return
+
+    passthrough = ["--rate", str(args.rate), "--chat-interval", str(args.chat_interval),
+                   "--latency", str(args.latency), "--workers", str(args.workers)]
+    for size in args.sizes:
+        out = subprocess.run([sys.executable, __file__, "--users", str(size), *passthrough],
+                             capture_output=True, text=True, check=True, cwd=ROOT).stdout
+        report(json.loads(out.strip().splitlines()[-1]))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Порівняння бекендів розбору сторінки t.me/s на збережених фікстурах.
+
+Запуск з кореня репозиторію:
+    python benchmarks/bench_extract.py [кількість повторів]
+"""
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import extractor
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+def measure(func, html, repeat):
+    func(html)  # прогрів
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(html)
+    elapsed = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    func(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    for fixture in sorted(FIXTURES.glob("channel_*.html")):
+        html = fixture.read_text(encoding="utf-8")
+        reference = extractor.extract_soup(html)
+        print(f"\n📄 {fixture.name}: {len(html) / 1024:.1f} KiB, {len(reference)} постів")
+        print(f"{'бекенд':<12} {'час, мс':>9} {'пік пам., KiB':>14} {'x швидше':>9}")
+
+        base_time = None
+        for name, func in extractor.BACKENDS.items():
+            if func(html) != reference:
+                print(f"{name:<12} ❌ результат відрізняється від html.parser")
+                continue
+            elapsed, peak = measure(func, html, repeat)
+            base_time = base_time or elapsed
+            print(f"{name:<12} {elapsed * 1000:>9.2f} {peak / 1024:>14.1f} {base_time / elapsed:>9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Пам'ять, яку займають підписки користувачів: старий формат (dict зі
+строковими ключами і списками словників) проти компактного сховища data.py.
+
+Запуск з кореня репозиторію:
+    python benchmarks/bench_memory.py [кількість користувачів]
+"""
+import gc
+import random
+import sys
+import tracemalloc
+from pathlib import Path
+from typing import NamedTuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import data
+from parser import normalize_queue
+
+QUEUES = [f"{q}.{s}" for q in range(1, 7) for s in (1, 2)]
+NAMES = ["Без назви"] * 8 + ["Дім", "Робота", "Дача", "Батьки"]
+
+def synthetic_rows(count: int, seed: int = 1):
+    """Рядки таблиці users так, як їх повертає Supabase"""
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(count):
+        queues = rnd.sample(QUEUES, rnd.choice([1, 1, 1, 2, 3]))
+        rows.append({
+            "user_id": str(300_000_000 + i * 7919),
+            # Кожен рядок — окремий об'єкт, як після розбору JSON-відповіді
+            "queues": [{"queue": "".join(q), "name": "".join(rnd.choice(NAMES))} for q in queues],
+            "notify_time": rnd.choice([5, 15, 30, 60, 120]),
+        })
+    return rows
+
+class LegacySubscriber(NamedTuple):
+    name: str
+    notify_time: int
+
+def legacy_layout(rows):
+    """Відтворення попереднього формату data.py"""
+    user_queues, user_notify_time, queue_subscribers = {}, {}, {}
+    for row in rows:
+        uid = str(row.get("user_id"))
+        user_queues[uid] = row.get("queues", [])
+        user_notify_time[uid] = row.get("notify_time", 30)
+        for q in user_queues[uid]:
+            queue_subscribers.setdefault(normalize_queue(q["queue"]), {})[uid] = LegacySubscriber(q["name"], user_notify_time[uid])
+    return user_queues, user_notify_time, queue_subscribers
+
+def compact_layout(rows):
+    data.users.clear()
+    data.queue_subscribers.clear()
+    data._apply_rows(rows)
+    return data.users, data.queue_subscribers
+
+def retained(build, count):
+    """Скільки пам'яті лишається зайнятою після завантаження і звільнення рядків відповіді"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    rows = synthetic_rows(count)
+    result = build(rows)
+    del rows
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    print(f"👥 {count} синтетичних користувачів")
+
+    legacy, legacy_bytes = retained(legacy_layout, count)
+    del legacy
+    compact, compact_bytes = retained(compact_layout, count)
+
+    print(f"{'формат':<10} {'МіБ':>8} {'байт/корист.':>13}")
+    print(f"{'старий':<10} {legacy_bytes / 2**20:>8.1f} {legacy_bytes / count:>13.0f}")
+    print(f"{'компактний':<10} {compact_bytes / 2**20:>8.1f} {compact_bytes / count:>13.0f}")
+    print(f"Економія: {(legacy_bytes - compact_bytes) / count:.0f} байт на користувача "
+          f"({1 - compact_bytes / legacy_bytes:.0%})")
+
+if __name__ == "__main__":
+    main()
@@ -1,51 +1,91 @@
-import os
+import asyncio
+import json
+import math
 import re
+import signal
 import threading
-from datetime import datetime, timedelta
-from flask import Flask
+import time
+from datetime import datetime
 from telegram import Update
 from telegram.ext import Application, CommandHandler, ContextTypes, MessageHandler, filters
 from telegram.request import HTTPXRequest
 
-from config import TOKEN
+from config import (
+    TOKEN, BROADCAST_WORKERS, STATE_BACKEND, STATE_SQLITE_PATH, STATE_FLUSH_INTERVAL,
+    PROFILER_ENABLED, PROFILER_TOKEN, WEB_HOST, WEB_PORT, WEBHOOK_URL, WEBHOOK_SECRET,
+    USER_RATE, USER_BURST, INTERACTIVE_STALE_WINDOW, HANDLER_CONCURRENCY
+)
 from data import (
-    user_queues, user_notify_time, load_data, 
+    get_client, user_writer, queue_subscribers, load_data_async, ensure_user, loaded,
     get_queues, add_queue, remove_queue, set_notify_time
 )
-from parser import get_queue_intervals, calculate_stats, get_last_posts
+from parser import (
+    get_queue_intervals, calculate_stats, get_snapshot, get_timeline, upcoming_entries, diff_intervals,
+    format_day_label, normalize_queue, min_poll_interval, close_http_client
+)
+from sources import SOURCES, split_queue
 from buttons import main_keyboard, queues_keyboard, notify_buttons
-
-# --- FLASK SERVER (Для Render) ---
-server = Flask('')
-
-@server.route('/')
-def home():
-    return "Бот працює", 200
-
-def run_web():
-    port = int(os.environ.get("PORT", 10000))
-    server.run(host='0.0.0.0', port=port, use_reloader=False)
-
-threading.Thread(target=run_web, daemon=True).start()
+from scheduler import AlertScheduler
+from broadcast import Broadcaster
+from state import ExpiringStore, PersistentStore
+from ratelimit import Coalescer, KeyedRateLimiter
+from persistence import SqliteStateBackend, SupabaseStateBackend, WriteBehind
+import metrics
+import profiler
+from web import WebServer, Response
 
 # --- ГЛОБАЛЬНІ ЗМІННІ ДЛЯ МОНІТОРИНГУ ---
-last_post_hash = {}     
-sent_notifications = {} 
+# Обидва сховища самі забувають старі записи, не ростуть понад maxsize
+# і переживають перезапуск: зміни відкладено пишуться в базу (state_writer)
+last_schedule = PersistentStore("last_schedule", ttl=7 * 24 * 3600, maxsize=50_000)  # "черга|день" -> розіслані інтервали
+sent_notifications = PersistentStore("sent_notifications", ttl=48 * 3600, maxsize=200_000)  # "user|черга|початок" -> True
+metrics.register_gauge("last_schedule_size", "Записів у last_schedule", lambda: len(last_schedule))
+metrics.register_gauge("sent_notifications_size", "Записів у sent_notifications", lambda: len(sent_notifications))
+metrics.register_histogram("check_cycle_seconds", "Тривалість циклу periodic_check")
+metrics.register_counter("check_queues_processed_total", "Черг з підписниками, переглянутих циклами перевірки")
+metrics.register_counter("check_queues_changed_total", "Черг, для яких розіслано зміни графіка")
+metrics.register_counter("check_users_processed_total", "Підписок, переглянутих циклами перевірки")
+alert_scheduler = None  # AlertScheduler, створюється в main()
+broadcaster = None      # Broadcaster, створюється в main()
+state_writer = None     # WriteBehind для стану сповіщень, створюється в main()
+web_server = None       # WebServer, створюється в main()
+
+# Кнопки, що читають графік: ліміт на користувача, злиття повторних натискань
+user_limiter = KeyedRateLimiter(USER_RATE, USER_BURST)
+user_requests = Coalescer()
+throttle_warned = ExpiringStore(ttl=30, maxsize=100_000)  # кому вже сказали "забагато запитів"
+metrics.register_counter("interactive_requests_total", "Кнопки графіка: served, coalesced, throttled")
+metrics.register_gauge("user_limiter_size", "Користувачів з активним лімітом запитів", lambda: len(user_limiter))
+USER_UNAVAILABLE = "⚠️ Не вдалося завантажити твої дані, спробуй за хвилину."
 
 # --- ДОПОМІЖНІ ФУНКЦІЇ ---
-async def safe_send(bot, chat_id, text, reply_markup=None):
-    """Безпечна відправка повідомлень з обробкою помилок"""
-    try:
-        await bot.send_message(chat_id=chat_id, text=text, reply_markup=reply_markup)
-    except Exception as e:
-        print(f"🔥 Помилка відправки користувачу {chat_id}: {e}")
-
-def parse_time_safe(time_str, now):
-    """Перетворює рядок часу 'HH:MM' у об'єкт datetime"""
-    if time_str == "24:00":
-        return datetime.combine(now.date(), datetime.min.time()) + timedelta(days=1)
-    t = datetime.strptime(time_str, "%H:%M")
-    return datetime.combine(now.date(), t.time())
+def schedule_block(day, intervals, now):
+    lines = [f"• {s} — {e}" for s, e in intervals]
+    return f"📅 {format_day_label(day, now)}:\n" + "\n".join(lines)
+
+def diff_block(day, diff, now):
+    """Лише зміни: нові, скасовані та зсунуті вимкнення"""
+    lines = [f"➕ {s} — {e}" for s, e in diff.added]
+    lines += [f"➖ {s} — {e} (скасовано)" for s, e in diff.removed]
+    lines += [f"🔁 {b[0]} — {b[1]} → {a[0]} — {a[1]}" for b, a in diff.shifted]
+    return f"📅 {format_day_label(day, now)}, зміни:\n" + "\n".join(lines)
+
+async def interactive(update: Update, context: ContextTypes.DEFAULT_TYPE, action: str, handler):
+    """Запускає handler не частіше, ніж дозволяє ліміт користувача.
+
+    Повторне натискання, поки відповідь ще готується, приєднується до неї
+    і не відповідає вдруге. Навантаження на канал від кнопок не залежить від
+    кількості натискань: знімок береться з кешу в межах INTERACTIVE_STALE_WINDOW."""
+    user_id = update.effective_user.id
+    key = (user_id, action)
+    if key not in user_requests and not user_limiter.try_acquire(user_id):
+        metrics.inc("interactive_requests_total", result="throttled")
+        if user_id not in throttle_warned:
+            throttle_warned[user_id] = True
+            await update.message.reply_text("⏳ Забагато запитів. Спробуй за кілька секунд.")
+        return
+    _, first = await user_requests.run(key, lambda: handler(update, context))
+    metrics.inc("interactive_requests_total", result="served" if first else "coalesced")
 
 # --- ОБРОБНИКИ КОМАНД ---
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -56,52 +96,30 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
 async def nowlight(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await interactive(update, context, "nowlight", _nowlight)
+
+async def _nowlight(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = str(update.effective_user.id)
+    if not await ensure_user(user_id):
+        await update.message.reply_text(USER_UNAVAILABLE)
+        return
     queues = get_queues(user_id)
     if not queues:
         await update.message.reply_text("Спочатку додай свою чергу!")
         return
 
     q_num = queues[0]["queue"]
-    intervals = await get_queue_intervals(q_num)
-    if not intervals:
+    snapshot = await get_snapshot(stale_window=INTERACTIVE_STALE_WINDOW)
+    # Таймлайн будується раз на знімок; тут лише бінарний пошук
+    timeline = get_timeline(snapshot, q_num)
+    if not timeline:
         await update.message.reply_text("Дані відсутні.")
         return
 
     now = datetime.now()
-    is_off = False
-    next_change = None
-    
-    # Створюємо список всіх подій (початок і кінець)
-    events = []
-    for s_str, e_str in intervals:
-        s_dt = parse_time_safe(s_str, now)
-        e_dt = parse_time_safe(e_str, now)
-        
-        # Обробка інтервалів, що переходять через північ
-        if e_dt <= s_dt:
-            # Якщо зараз ніч і ми після початку, але перед кінцем
-            if now < e_dt: 
-                s_dt -= timedelta(days=1)
-            else:
-                e_dt += timedelta(days=1)
-        
-        events.append((s_dt, e_dt, s_str, e_str))
-
-    # Перевіряємо поточний стан
-    for s_dt, e_dt, s_str, e_str in events:
-        if s_dt <= now < e_dt:
-            is_off = True
-            next_change = e_str # Світло з'явиться в кінці інтервалу
-            break
-    
-    # Якщо світло є, шукаємо найближче вимкнення
-    if not is_off:
-        future_starts = [s_dt for s_dt, e_dt, s_str, e_str in events if s_dt > now]
-        if future_starts:
-            next_event_dt = min(future_starts)
-            # Знаходимо рядок часу для цього dt
-            next_change = [s_str for s_dt, e_dt, s_str, e_str in events if s_dt == next_event_dt][0]
+    is_off = timeline.is_off(now)
+    change = timeline.next_change(now)
+    next_change = change[1] if change else None
 
     status = f"⚡ Черга {q_num}\n\n"
     if is_off:
@@ -112,59 +130,120 @@ async def nowlight(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(status, reply_markup=main_keyboard())
 
 # --- ФОНОВА ПЕРЕВІРКА ТА РОЗСИЛКА ---
+async def send_alert(context: ContextTypes.DEFAULT_TYPE, alert):
+    """Спрацьовує точно в момент попередження, запланований AlertScheduler"""
+    notif_key = f"{alert.user_id}|{alert.queue}|{alert.start_dt:%Y-%m-%dT%H:%M}"
+    if notif_key in sent_notifications:
+        return
+
+    # Запізніле попередження (наприклад, після зміни налаштувань) показує реальний залишок
+    minutes_left = math.ceil((alert.start_dt - datetime.now()).total_seconds() / 60)
+    notify_min = max(1, min(alert.notify_min, minutes_left))
+    msg = f"⏰ Через {notify_min} хв СВІТЛО БУДЕ ВИМКНЕНО!\nЧерга: {alert.queue} ({alert.name})"
+    # Текст не містить часу вимкнення, тож дублем є лише те саме вимкнення
+    def delivered(chat_id):
+        # Позначка ставиться лише після доставки: недоставлене до зупинки бота
+        # попередження буде надіслано знову після перезапуску
+        sent_notifications[notif_key] = True
+
+    broadcaster.submit([(alert.user_id, msg, notif_key)], "попередження", on_sent=delivered)
+
 async def periodic_check(context: ContextTypes.DEFAULT_TYPE):
-    """Функція, що працює кожні 5 хвилин: перевіряє графіки та шле сповіщення"""
-    app = context.application
+    """Читає канали за їхнім розкладом: розсилає оновлені графіки й перепланує попередження"""
+    # Поки користувачі вантажаться, розсилка охопила б лише частину підписників
+    if not loaded.is_set():
+        return
+    with metrics.timer("check_cycle_seconds"):
+        await _check_channels()
+
+async def _check_channels():
+    # Один запит до кожного каналу на весь цикл — всі черги читають той самий знімок
+    snapshot = await get_snapshot(max_age=None)
+    if not snapshot.posts: return
+    
+    sent_notifications.purge()
+    last_schedule.purge()
+
+    # Графік і різниця рахуються один раз на чергу; на користувачів розходиться лише доставка
     now = datetime.now()
+    messages = []
+    for q_num, subscribers in list(queue_subscribers.items()):
+        blocks = []
+        for day, entry in upcoming_entries(snapshot, q_num, now):
+            key = f"{q_num}|{day:%Y-%m-%d}"
+            previous = last_schedule.get(key)
+            if previous is None:
+                blocks.append(schedule_block(day, entry.intervals, now))
+            else:
+                diff = diff_intervals(previous, entry.intervals)
+                if not diff.changed:
+                    continue
+                blocks.append(diff_block(day, diff, now))
+            last_schedule[key] = [list(i) for i in entry.intervals]
+        if not blocks:
+            continue
+
+        metrics.inc("check_queues_changed_total")
+        body = "\n\n".join(blocks)
+        for user_id, sub in list(subscribers.items()):
+            messages.append((user_id, f"⚡️ ОНОВЛЕНО ГРАФІК ({q_num} {sub.name}):\n\n{body}"))
+
+    metrics.inc("check_queues_processed_total", len(queue_subscribers))
+    metrics.inc("check_users_processed_total", sum(len(s) for s in queue_subscribers.values()))
+
+    # Розсилка йде у фоні: перевірка не чекає на тисячі відправок
+    if messages:
+        broadcaster.submit(messages, "оновлення графіка")
+
+    # Попередження надсилають run_once-завдання; тут лише перепланування змінених черг
+    if alert_scheduler:
+        alert_scheduler.sync(snapshot)
+
+async def check_queue(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id = str(update.effective_user.id)
+    queues = get_queues(user_id)
+    if not queues:
+        await update.message.reply_text("Твій список порожній. Додай чергу, щоб перевірити її статус.", reply_markup=main_keyboard())
+        return
     
-    posts = await get_last_posts()
-    if not posts: return
+    q_num = queues[0]["queue"]
+    snapshot = await get_snapshot(stale_window=INTERACTIVE_STALE_WINDOW)
+    intervals = await get_queue_intervals(q_num, snapshot)
+    stats = await calculate_stats(q_num, snapshot)
+    
+    if not intervals or stats is None:
+        await update.message.reply_text(
+            f"⚠️ **Дані тимчасово недоступні.**\n\n"
+            "Не вдалося отримати графік. Можливі причини:\n"
+            "• Проблеми зі з'єднанням (як у твоїй помилці NetworkError)\n"
+            "• Обленерго ще не оновило пост у Telegram\n"
+            "• Змінився формат повідомлень на каналі\n\n"
+            "Спробуй натиснути кнопку ще раз через хвилину.",
+            parse_mode="Markdown",
+            reply_markup=main_keyboard()
+        )
+        return
     
-    latest_post = posts[-1]
-    post_hash = hash(latest_post)
-
-    for user_id, queues in user_queues.items():
-        uid_int = int(user_id)
-        notify_min = user_notify_time.get(user_id, 30)
-
-        for q_data in queues:
-            q_num = q_data["queue"]
-            q_name = q_data["name"]
-            user_q_key = f"{user_id}_{q_num}"
-
-            if last_post_hash.get(user_q_key) != post_hash:
-                intervals = await get_queue_intervals(q_num)
-                if intervals:
-                    times_text = "\n".join([f"• {s} — {e}" for s, e in intervals])
-                    msg = f"⚡️ ОНОВЛЕНО ГРАФІК ({q_num} {q_name}):\n\n{times_text}"
-                    await safe_send(app.bot, uid_int, msg)
-                    last_post_hash[user_q_key] = post_hash
-
-            intervals = await get_queue_intervals(q_num)
-            if not intervals: continue
-
-            for s_str, e_str in intervals:
-                start_dt = parse_time_safe(s_str, now)
-                
-                if start_dt < now - timedelta(hours=12):
-                    start_dt += timedelta(days=1)
-                
-                notify_time_target = start_dt - timedelta(minutes=notify_min)
-                
-                notif_key = f"{user_id}_{q_num}_{s_str}_{start_dt.strftime('%Y%m%d')}"
-
-                if now >= notify_time_target and now < start_dt:
-                    if notif_key not in sent_notifications:
-                        alert = f"⏰ Через {notify_min} хв СВІТЛО БУДЕ ВИМКНЕНО!\nЧерга: {q_num} ({q_name})"
-                        await safe_send(app.bot, uid_int, alert)
-                        sent_notifications[notif_key] = True
-
-        keys_to_delete = [k for k, v in sent_notifications.items() if k.startswith(user_id) and "some_date_logic" in k]
+    schedule_text = "\n".join([f"• {s} — {e}" for s, e in intervals])
+    
+    response = (
+        f"📅 *Графік на {stats['date']}* (черга {q_num}):\n\n"
+        f"{schedule_text}\n\n"
+        f"📊 *Статистика:*\n"
+        f"🔌 Без світла: {stats['total_off']}\n"
+        f"💡 Зі світлом: {stats['total_on']}\n"
+        f"🔄 Кількість вимкнень: {stats['num_outages']}"
+    )
+    await update.message.reply_text(response, parse_mode="Markdown", reply_markup=main_keyboard())
 
 # --- ОБРОБКА ПОВІДОМЛЕНЬ МЕНЮ ---
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     text = update.message.text
     user_id = str(update.effective_user.id)
+    if not await ensure_user(user_id):
+        # Без збережених даних додавання черги чи зміна часу затерли б їх у базі
+        await update.message.reply_text(USER_UNAVAILABLE)
+        return
     
     if text == "⬅ Назад":
         context.user_data["action"] = None
@@ -172,45 +251,16 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     if text == "⚡ Перевірити чергу":
-        user_id = str(update.effective_user.id)
-        queues = get_queues(user_id)
-        if not queues:
-            await update.message.reply_text("Твій список порожній. Додай чергу, щоб перевірити її статус.", reply_markup=main_keyboard())
-            return
-        
-        q_num = queues[0]["queue"]
-        intervals = await get_queue_intervals(q_num)
-        stats = await calculate_stats(q_num)
-        
-        if not intervals or stats is None:
-            await update.message.reply_text(
-                f"⚠️ **Дані тимчасово недоступні.**\n\n"
-                "Не вдалося отримати графік. Можливі причини:\n"
-                "• Проблеми зі з'єднанням (як у твоїй помилці NetworkError)\n"
-                "• Обленерго ще не оновило пост у Telegram\n"
-                "• Змінився формат повідомлень на каналі\n\n"
-                "Спробуй натиснути кнопку ще раз через хвилину.",
-                parse_mode="Markdown",
-                reply_markup=main_keyboard()
-            )
-            return
-        
-        schedule_text = "\n".join([f"• {s} — {e}" for s, e in intervals])
-        
-        response = (
-            f"📅 *Графік на {stats['date']}* (черга {q_num}):\n\n"
-            f"{schedule_text}\n\n"
-            f"📊 *Статистика:*\n"
-            f"🔌 Без світла: {stats['total_off']}\n"
-            f"💡 Зі світлом: {stats['total_on']}\n"
-            f"🔄 Кількість вимкнень: {stats['num_outages']}"
-        )
-        await update.message.reply_text(response, parse_mode="Markdown", reply_markup=main_keyboard())
+        await interactive(update, context, "check", check_queue)
         return
 
     if text == "➕ Додати чергу":
         context.user_data["action"] = "add"
-        await update.message.reply_text("Введи чергу (наприклад: 4.1 або 4.1 Дім)", parse_mode="Markdown")
+        hint = "Введи чергу (наприклад: 4.1 або 4.1 Дім)"
+        other_sources = [key for key in SOURCES if key]
+        if other_sources:
+            hint += "\nЧерги інших обленерго — з префіксом: " + ", ".join(f"{key}:4.1" for key in other_sources)
+        await update.message.reply_text(hint, parse_mode="Markdown")
         return
     
     elif text == "🗑 Видалити чергу":
@@ -237,6 +287,8 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     elif text in ["5", "15", "30", "60", "120"]:
         set_notify_time(user_id, int(text))
+        if alert_scheduler:
+            alert_scheduler.reschedule_user(user_id)
         await update.message.reply_text(f"✅ Готово! Буду попереджати за {text} хв.")
         return
 
@@ -248,8 +300,14 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     action = context.user_data.get("action")
     if action == "add":
         context.user_data["action"] = None
-        parts = text.text.split(maxsplit=1)
-        if add_queues(user_id, parts[0], parts[1] if len(parts) > 1 else "Без назви"):
+        parts = text.split(maxsplit=1)
+        source_key, _ = split_queue(normalize_queue(parts[0]))
+        if source_key not in SOURCES:
+            await update.message.reply_text(f"❌ Невідоме джерело '{source_key}'")
+            return
+        if add_queue(user_id, parts[0], parts[1] if len(parts) > 1 else "Без назви"):
+            if alert_scheduler:
+                alert_scheduler.reschedule_user(user_id)
             await update.message.reply_text("✅ Додано успішно!", reply_markup=main_keyboard())
         else:
             await update.message.reply_text("❌ Помилка: черга вже є або невірний формат")
@@ -258,28 +316,168 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         context.user_data["action"] = None
         queue_to_del = text.split()[0]
         if remove_queue(user_id, queue_to_del):
+            if alert_scheduler:
+                alert_scheduler.reschedule_user(user_id)
             await update.message.reply_text(f"🗑 Видалено чергу {queue_to_del}", reply_markup=main_keyboard())
         else:
             await update.message.reply_text("❌ Чергу не знайдено")
 
+# --- HTTP-СЕРВЕР (health для Render, метрики, вебхук) ---
+WEBHOOK_PATH = "/telegram"
+
+async def home(request):
+    return Response(200, "Бот працює")
+
+async def metrics_page(request):
+    return Response(200, metrics.render(), "text/plain; version=0.0.4; charset=utf-8")
+
+async def profile_page(request):
+    """?seconds=10&interval=0.005&all=1 — згорнуті стеки потоку бота (або всіх потоків)"""
+    if not PROFILER_ENABLED:
+        return Response(404, "Профайлер вимкнено (PROFILER_ENABLED=1)")
+    if PROFILER_TOKEN and request.query.get("token") != PROFILER_TOKEN:
+        return Response(403, "Невірний токен")
+    try:
+        seconds = float(request.query.get("seconds", 10))
+        interval = max(float(request.query.get("interval", 0.005)), 0.001)
+    except ValueError:
+        return Response(400, "Некоректні параметри")
+    # Семплер працює в окремому потоці й знімає стеки потоку з циклом подій
+    thread_id = None if request.query.get("all") else threading.get_ident()
+    stacks = await asyncio.to_thread(profiler.sample, seconds, interval, thread_id)
+    if stacks is None:
+        return Response(409, "Профілювання вже виконується")
+    return Response(200, profiler.collapsed(stacks))
+
+def build_web_server(application: Application):
+    server = WebServer(WEB_HOST, WEB_PORT)
+    server.route("/")(home)
+    server.route("/metrics")(metrics_page)
+    server.route("/debug/profile")(profile_page)
+
+    @server.route(WEBHOOK_PATH, method="POST")
+    async def telegram_webhook(request):
+        # Telegram повторює секрет із set_webhook у кожному запиті
+        if WEBHOOK_SECRET and request.headers.get("x-telegram-bot-api-secret-token") != WEBHOOK_SECRET:
+            return Response(403, "Невірний секрет")
+        try:
+            update = Update.de_json(json.loads(request.body), application.bot)
+        except ValueError:
+            return Response(400, "Некоректне оновлення")
+        await application.update_queue.put(update)
+        return Response(200, "ok")
+
+    return server
+
 # --- ЗАПУСК БОТА ---
+def load_state():
+    """Відновлює стан сповіщень після перезапуску, щоб нічого не надіслати двічі"""
+    if STATE_BACKEND == "sqlite":
+        backend = SqliteStateBackend(STATE_SQLITE_PATH)
+    else:
+        backend = SupabaseStateBackend(get_client())
+    try:
+        now = time.time()
+        rows = backend.load(now)
+        restored = last_schedule.restore(rows) + sent_notifications.restore(rows)
+        backend.delete_expired(now)
+        print(f"✅ Стан відновлено: {restored} записів")
+    except Exception as e:
+        print(f"❌ Помилка завантаження стану: {e}")
+    return backend
+
+async def load_users(application: Application):
+    """Фонове завантаження користувачів; одразу після нього — перша перевірка"""
+    await load_data_async()
+    if application.job_queue:
+        application.job_queue.run_once(periodic_check, 0)
+
+async def on_startup(application: Application):
+    """Запускає фонові сервіси на циклі подій бота"""
+    await web_server.start()
+    broadcaster.start()
+    state_writer.start()
+    user_writer.start()
+    # Бот відповідає одразу, не чекаючи, поки прочитається вся таблиця users
+    application.create_task(load_users(application))
+
+async def on_stop(application: Application):
+    """Дочікується розсилки, поки клієнт Bot API ще відкритий (до Application.shutdown)"""
+    await broadcaster.stop()
+
+async def on_shutdown(application: Application):
+    """Звільняє ресурси, прив'язані до життєвого циклу бота"""
+    # Після розсилки: позначки доставлених попереджень ще мають потрапити в базу
+    await state_writer.stop()
+    await user_writer.stop()
+    await close_http_client()
+    await web_server.stop()
+
+async def run_webhook(application: Application):
+    """Режим вебхука: Telegram сам надсилає оновлення, без постійного long-poll"""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    # Той самий порядок, що й у run_polling: initialize -> post_init -> start
+    await application.initialize()
+    await on_startup(application)
+    try:
+        await application.bot.set_webhook(
+            WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH, secret_token=WEBHOOK_SECRET or None,
+            allowed_updates=Update.ALL_TYPES, drop_pending_updates=True,
+        )
+        await application.start()
+        print("🚀 Бот запущений у режимі вебхука!")
+        await stop.wait()
+    finally:
+        # Той самий порядок, що й у run_polling: stop -> post_stop -> shutdown -> post_shutdown
+        if application.running:
+            await application.stop()
+        await on_stop(application)
+        await application.shutdown()
+        await on_shutdown(application)
+
 def main():
-    print("🔋 Завантаження даних з Supabase...")
-    load_data() 
+    global alert_scheduler, broadcaster, state_writer, web_server
+    state_backend = load_state()
+    state_writer = WriteBehind(state_backend.save_many, interval=STATE_FLUSH_INTERVAL, name="стан сповіщень")
+    last_schedule.writer = state_writer
+    sent_notifications.writer = state_writer
     
-    request = HTTPXRequest(connect_timeout=15, read_timeout=20)
-    application = Application.builder().token(TOKEN).request(request).build()
+    # Пул з'єднань з Bot API: воркери розсилки + запас для обробників; паралельні
+    # обробники при піку чекають на вільне з'єднання, а не падають з PoolTimeout
+    request = HTTPXRequest(connect_timeout=15, read_timeout=20, pool_timeout=10,
+                           connection_pool_size=BROADCAST_WORKERS + 4)
+    application = Application.builder().token(TOKEN).request(request).post_init(on_startup).post_stop(on_stop).post_shutdown(on_shutdown) \
+        .concurrent_updates(HANDLER_CONCURRENCY).build()
+
+    broadcaster = Broadcaster(application.bot)
+    web_server = build_web_server(application)
+    for key in ("sent", "failed", "retried", "deduplicated"):
+        metrics.register_gauge(f"broadcast_{key}_total", f"Broadcaster.stats['{key}']",
+                               lambda key=key: broadcaster.stats[key], kind="counter")
+    metrics.register_gauge("broadcast_queue_size", "Повідомлень у черзі розсилки", lambda: broadcaster.queue.qsize())
+    metrics.register_gauge("state_writer_pending", "Незаписаних змін стану сповіщень", lambda: len(state_writer.pending))
+    metrics.register_gauge("user_writer_pending", "Незаписаних змін користувачів", lambda: len(user_writer.pending))
 
     # Реєстрація обробників
     application.add_handler(CommandHandler("start", start))
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
     
-    # Налаштування періодичної перевірки (кожні 300 сек)
+    # Перевірка запускається так часто, як того вимагає найчастіше опитуване джерело
     if application.job_queue:
-        application.job_queue.run_repeating(periodic_check, interval=300, first=10)
+        alert_scheduler = AlertScheduler(application.job_queue, send_alert)
+        metrics.register_gauge("alerts_pending", "Запланованих попереджень", alert_scheduler.pending)
+        application.job_queue.run_repeating(periodic_check, interval=min_poll_interval(), first=10)
 
-    print("🚀 Бот запущений та готовий до роботи!")
-    application.run_polling(drop_pending_updates=True)
+    if WEBHOOK_URL:
+        asyncio.run(run_webhook(application))
+    else:
+        print("🚀 Бот запущений та готовий до роботи!")
+        # run_polling сам видаляє вебхук, якщо бот раніше працював у режимі вебхука
+        application.run_polling(drop_pending_updates=True)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,165 @@
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+
+from config import BROADCAST_WORKERS, BROADCAST_RATE, BROADCAST_CHAT_INTERVAL, BROADCAST_MAX_RETRIES
+from ratelimit import TokenBucket
+
+DEDUPE_TTL = 3600      # секунд: той самий текст тому самому чату не дублюємо
+PROGRESS_EVERY = 500   # як часто друкувати прогрес великої розсилки
+
+class Batch:
+    """Одна розсилка: лічильники для прогресу й підсумку"""
+
+    def __init__(self, label: str, total: int, on_sent=None):
+        self.label = label
+        self.total = total
+        self.on_sent = on_sent  # on_sent(chat_id) після кожної успішної доставки
+        self.sent = 0
+        self.failed = 0
+        self.started = time.monotonic()
+
+    @property
+    def finished(self):
+        return self.sent + self.failed >= self.total
+
+    def report(self):
+        elapsed = time.monotonic() - self.started
+        rate = self.sent / elapsed if elapsed > 0 else 0.0
+        print(f"📨 Розсилка «{self.label}»: {self.sent}/{self.total} за {elapsed:.1f} с "
+              f"({rate:.1f} повід./с), помилок {self.failed}")
+
+class Broadcaster:
+    """Пул воркерів, що розсилає повідомлення з дотриманням лімітів Telegram.
+
+    Глобальний ліміт — токен-бакет на весь бот, для кожного чату — не частіше
+    ніж раз на chat_interval секунд. RetryAfter ставить на паузу всі воркери."""
+
+    def __init__(self, bot, workers=BROADCAST_WORKERS, rate=BROADCAST_RATE,
+                 chat_interval=BROADCAST_CHAT_INTERVAL, max_retries=BROADCAST_MAX_RETRIES):
+        self.bot = bot
+        self.workers = workers
+        self.chat_interval = chat_interval
+        self.max_retries = max_retries
+        self.limiter = TokenBucket(rate)
+        self.queue = asyncio.Queue()
+        self.stats = {"sent": 0, "failed": 0, "retried": 0, "deduplicated": 0}
+        self._tasks = []
+        self._chat_next = {}        # chat_id -> момент, коли чату можна писати знову
+        self._recent = OrderedDict() # (chat_id, хеш тексту) -> момент відправки
+        self._paused_until = 0.0
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, timeout: float = 10):
+        """Дочікується черги (не довше timeout) і зупиняє воркерів"""
+        if self._tasks:
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout)
+            except asyncio.TimeoutError:
+                print(f"⚠️ Розсилку перервано: в черзі лишилося {self.queue.qsize()} повідомлень")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, messages, label: str = "розсилка", on_sent=None):
+        """Ставить у чергу (chat_id, text) або (chat_id, text, ключ дедуплікації) і одразу повертає Batch.
+
+        Без ключа дублем вважається той самий текст тому самому чату. Явний ключ
+        потрібен, коли різні події мають однаковий текст (попередження про два
+        вимкнення однієї черги)."""
+        self.start()
+        self._forget_expired()
+        items = []
+        for chat_id, text, *dedupe in messages:
+            key = (chat_id, dedupe[0] if dedupe else hash(text))
+            if key in self._recent:
+                self.stats["deduplicated"] += 1
+                continue
+            # Резервуємо ключ одразу, щоб дубль у цій же розсилці не потрапив у чергу
+            self._recent[key] = time.monotonic()
+            items.append((chat_id, text, key))
+
+        batch = Batch(label, len(items), on_sent)
+        for chat_id, text, key in items:
+            self.queue.put_nowait((chat_id, text, key, batch, 0))
+        return batch
+
+    def _forget_expired(self):
+        deadline = time.monotonic() - DEDUPE_TTL
+        while self._recent:
+            key, sent_at = next(iter(self._recent.items()))
+            if sent_at > deadline:
+                break
+            self._recent.popitem(last=False)
+        if len(self._chat_next) > 10_000:
+            now = time.monotonic()
+            self._chat_next = {c: t for c, t in self._chat_next.items() if t > now}
+
+    async def _worker(self):
+        while True:
+            item = await self.queue.get()
+            try:
+                await self._deliver(*item)
+            except Exception as e:
+                print(f"🔥 Помилка воркера розсилки: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def _deliver(self, chat_id, text, key, batch, attempt):
+        now = time.monotonic()
+        # Слот чату займається до сну: інакше кілька воркерів з повідомленнями
+        # одному чату чекали б однаково й надсилали одночасно, у довільному порядку
+        slot = max(now, self._paused_until, self._chat_next.get(chat_id, 0.0))
+        self._chat_next[chat_id] = slot + self.chat_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+        await self.limiter.acquire()
+
+        try:
+            await self.bot.send_message(chat_id=chat_id, text=text)
+        except RetryAfter as e:
+            delay = e.retry_after
+            if isinstance(delay, timedelta):
+                delay = delay.total_seconds()
+            # Flood control діє на весь бот — зупиняємо всіх воркерів
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            return self._retry(chat_id, text, key, batch, attempt, e)
+        except (Forbidden, BadRequest) as e:
+            # Користувач заблокував бота або чат не існує — повтор не допоможе
+            return self._fail(chat_id, key, batch, e)
+        except NetworkError as e:
+            self._chat_next[chat_id] = time.monotonic() + 2 ** attempt
+            return self._retry(chat_id, text, key, batch, attempt, e)
+
+        batch.sent += 1
+        self.stats["sent"] += 1
+        if batch.on_sent is not None:
+            batch.on_sent(chat_id)
+        self._progress(batch)
+
+    def _retry(self, chat_id, text, key, batch, attempt, error):
+        if attempt >= self.max_retries:
+            return self._fail(chat_id, key, batch, error)
+        self.stats["retried"] += 1
+        self.queue.put_nowait((chat_id, text, key, batch, attempt + 1))
+
+    def _fail(self, chat_id, key, batch, error):
+        print(f"🔥 Помилка відправки користувачу {chat_id}: {error}")
+        # Невдале повідомлення можна буде надіслати повторно наступного разу
+        self._recent.pop(key, None)
+        batch.failed += 1
+        self.stats["failed"] += 1
+        self._progress(batch)
+
+    def _progress(self, batch):
+        done = batch.sent + batch.failed
+        if batch.finished or done % PROGRESS_EVERY == 0:
+            if batch.total > 1:
+                batch.report()
@@ -8,6 +8,58 @@ API_ID = os.getenv("API_ID", "")
 API_HASH = os.getenv("API_HASH", "")
 CHANNEL_USERNAME = os.getenv("CHANNEL_USERNAME", "")
 CHANNEL_URL = os.getenv("CHANNEL_URL", "")
+# Додаткові канали (JSON, див. sources.py) і як часто перевіряти канал за замовчуванням
+CHANNEL_SOURCES = os.getenv("CHANNEL_SOURCES", "")
+POLL_INTERVAL = float(os.getenv("POLL_INTERVAL", "300"))
+# Як часто перечитувати всю сторінку каналу, а не лише нові пости (?after=).
+# Обленерго виправляють графіки редагуванням посту, тож за замовчуванням — на кожній перевірці:
+# незмінна сторінка все одно відсікається ETag або хешем тіла без розбору
+FULL_REFRESH_INTERVAL = float(os.getenv("FULL_REFRESH_INTERVAL", str(POLL_INTERVAL)))
+# Скільки чекати повільне джерело, перш ніж віддати його попередній знімок
+SOURCE_WAIT_TIMEOUT = float(os.getenv("SOURCE_WAIT_TIMEOUT", "3"))
+# Бекенд розбору сторінки каналу: auto | lxml | stream | strainer | html.parser
+PARSER_BACKEND = os.getenv("PARSER_BACKEND", "auto")
+
+# HTTP-клієнт для читання каналу (один на весь процес, з keep-alive)
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "10"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "5"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "600"))
+HTTP2 = os.getenv("HTTP2", "1") == "1"
+
+# Масові розсилки: Telegram дозволяє ~30 повідомлень/с на бот і ~1/с в один чат
+BROADCAST_WORKERS = int(os.getenv("BROADCAST_WORKERS", "8"))
+BROADCAST_RATE = float(os.getenv("BROADCAST_RATE", "25"))
+BROADCAST_CHAT_INTERVAL = float(os.getenv("BROADCAST_CHAT_INTERVAL", "1"))
+BROADCAST_MAX_RETRIES = int(os.getenv("BROADCAST_MAX_RETRIES", "3"))
+
+# Кнопки, що читають графік: ліміт на користувача (запитів/с і запас) і
+# скільки секунд знімок можна віддавати одразу, оновлюючи його у фоні
+USER_RATE = float(os.getenv("USER_RATE", "0.5"))
+USER_BURST = float(os.getenv("USER_BURST", "3"))
+INTERACTIVE_STALE_WINDOW = float(os.getenv("INTERACTIVE_STALE_WINDOW", "300"))
+# Скільки оновлень обробляються одночасно (повільний канал не блокує всіх)
+HANDLER_CONCURRENCY = int(os.getenv("HANDLER_CONCURRENCY", "64"))
+
+# Стан сповіщень між перезапусками: supabase | sqlite (локально та в тестах)
+STATE_BACKEND = os.getenv("STATE_BACKEND", "supabase")
+STATE_SQLITE_PATH = os.getenv("STATE_SQLITE_PATH", "bot_state.sqlite3")
+STATE_FLUSH_INTERVAL = float(os.getenv("STATE_FLUSH_INTERVAL", "5"))
+
+# HTTP-сервер бота (health, /metrics, вебхук); PORT задає Render
+WEB_HOST = os.getenv("WEB_HOST", "0.0.0.0")
+WEB_PORT = int(os.getenv("PORT", "10000"))
+# Якщо задано публічну адресу — оновлення приходять вебхуком замість long-poll
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+
+# Семплювальний профайлер на /debug/profile: вимкнений, поки явно не ввімкнуто
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "0") == "1"
+PROFILER_TOKEN = os.getenv("PROFILER_TOKEN", "")
+
+# Як довго зміни користувачів можуть лишатися незаписаними в базу
+USERS_FLUSH_INTERVAL = float(os.getenv("USERS_FLUSH_INTERVAL", "2"))
 
 SUPABASE_URL = os.environ.get("SUPBASE_URL", "")
 SUPABASE_KEY = os.environ.get("SUPABASE_KEY", "")
\ No newline at end of file
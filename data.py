@@ -1,82 +1,238 @@
+import asyncio
 import os
+import sys
+import time
 from supabase import create_client, Client
-from config import SUPABASE_URL, SUPABASE_KEY
-
-# Ініціалізація клієнта Supabase
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
-# Локальний кеш для швидкості (щоб не робити запит до бази при кожному кліку)
-user_queues = {}
-user_notify_time = {}
+from config import SUPABASE_URL, SUPABASE_KEY, USERS_FLUSH_INTERVAL
+from parser import normalize_queue
+from persistence import WriteBehind, UPSERT_CHUNK
+import metrics
+
+# Клієнт Supabase створюється при першому зверненні; в тестах його можна
+# підмінити локальною заміною: set_client(FakeSupabase())
+_client: Client = None
+
+def get_client():
+    global _client
+    if _client is None:
+        _client = create_client(SUPABASE_URL, SUPABASE_KEY)
+    return _client
+
+def set_client(client):
+    global _client
+    _client = client
+
+# --------- КОМПАКТНЕ СХОВИЩЕ ПІДПИСОК ---------
+
+DEFAULT_NOTIFY_TIME = 30
+
+class Subscription:
+    """Одна черга користувача. Рядки інтерновані: тисячі підписників однієї
+    черги ділять один об'єкт '4.1' і один 'Без назви'."""
+    __slots__ = ("queue", "name", "user")
+
+    def __init__(self, queue: str, name: str, user):
+        self.queue = sys.intern(queue)
+        self.name = sys.intern(name)
+        self.user = user
+
+    @property
+    def notify_time(self):
+        return self.user.notify_time
+
+    def __getitem__(self, key):
+        # Сумісність зі старим форматом {"queue": ..., "name": ...}
+        return getattr(self, key)
+
+class UserRecord:
+    __slots__ = ("user_id", "queues", "notify_time")
+
+    def __init__(self, user_id: int, notify_time: int = DEFAULT_NOTIFY_TIME):
+        self.user_id = user_id
+        self.queues = []
+        self.notify_time = notify_time
+
+    def add(self, queue: str, name: str):
+        sub = Subscription(queue, name, self)
+        self.queues.append(sub)
+        queue_subscribers.setdefault(normalize_queue(sub.queue), {})[self.user_id] = sub
+        return sub
+
+    def to_row(self):
+        return {
+            "user_id": str(self.user_id),
+            "queues": [{"queue": q.queue, "name": q.name} for q in self.queues],
+            "notify_time": self.notify_time
+        }
+
+# Локальний кеш для швидкості (щоб не робити запит до бази при кожному кліку).
+# Ключі — int: ніяких перетворень str <-> int у гарячих циклах
+users = {}  # user_id -> UserRecord
+
+# Інвертований індекс: черга -> {user_id: Subscription}.
+# Дозволяє рахувати графік і сповіщення один раз на чергу, а не на користувача
+queue_subscribers = {}
+
+def _uid(user_id):
+    return int(user_id)
+
+metrics.register_gauge("users_total", "Користувачів у пам'яті", lambda: len(users))
+metrics.register_gauge("queues_total", "Різних черг з підписниками", lambda: len(queue_subscribers))
 
 # --------- СИНХРОНІЗАЦІЯ З БАЗОЮ ---------
 
-def load_data():
-    """Завантажує всі дані з Supabase в оперативну пам'ять"""
-    try:
-        response = supabase.table("users").select("*").execute()
-        for row in response.data:
-            uid = str(row.get('user_id'))
-            user_queues[uid] = row.get('queues', [])
-            user_notify_time[uid] = row.get('notify_time', 30)
-        print(f"✅ Дані синхронізовано: {len(response.data)} користувачів")
-    except Exception as e:
-        print(f"❌ Помилка завантаження бази: {e}")
-
-def save_user_to_db(user_id: str):
-    """Зберігає дані конкретного користувача в Supabase"""
-    user_id = str(user_id)
-    data = {
-        "user_id": user_id,
-        "queues": user_queues.get(user_id, []),
-        "notify_time": user_notify_time.get(user_id, 30)
-    }
+# Поки loaded не встановлено, таблиця ще читається сторінками у фоні,
+# а користувачі, яких ще немає в пам'яті, дочитуються поодинці (ensure_user)
+loaded = asyncio.Event()
+LOAD_PAGE_SIZE = 1000  # PostgREST за замовчуванням віддає не більше 1000 рядків
+LOAD_RETRY_DELAYS = (1, 2, 5, 10, 30)  # секунд перед повтором сторінки; далі — остання
+
+def _apply_rows(rows):
+    for row in rows:
+        uid = _uid(row.get('user_id'))
+        if uid in users:
+            continue  # Користувач уже дочитаний окремо і міг змінитися — не перезаписуємо
+        record = users[uid] = UserRecord(uid, int(row.get('notify_time') or DEFAULT_NOTIFY_TIME))
+        for q in row.get('queues') or []:
+            record.add(q["queue"], q["name"])
+
+def _fetch_page(start: int, page_size: int):
+    return (get_client().table("users").select("*").order("user_id")
+            .range(start, start + page_size - 1).execute().data)
+
+def _report_load(count, started):
+    elapsed = time.monotonic() - started
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f"✅ Дані синхронізовано: {count} користувачів за {elapsed:.1f} с ({rate:.0f} корист./с)")
+
+async def load_data_async(page_size: int = LOAD_PAGE_SIZE):
+    """Читає всю таблицю users сторінками у фоні, а бот уже обслуговує користувачів.
+
+    Сторінка, яку не вдалося прочитати, повторюється з тієї ж позиції з наростаючою
+    паузою. loaded встановлюється лише після останньої сторінки: доти ensure_user
+    дочитує кожного користувача окремо, і недочитаний запис не перезапише збережений."""
+    print("🔋 Завантаження даних з Supabase...")
+    started = time.monotonic()
+    count = 0
+    failures = 0
+    while True:
+        try:
+            rows = await asyncio.to_thread(_fetch_page, count, page_size)
+        except Exception as e:
+            delay = LOAD_RETRY_DELAYS[min(failures, len(LOAD_RETRY_DELAYS) - 1)]
+            failures += 1
+            print(f"❌ Помилка завантаження бази (з {count}-го рядка): {e}. Повтор через {delay} с")
+            await asyncio.sleep(delay)
+            continue
+        failures = 0
+        # Рядки застосовуються в циклі подій — без гонок з обробниками
+        _apply_rows(rows)
+        count += len(rows)
+        if len(rows) < page_size:
+            break
+    _report_load(count, started)
+    loaded.set()
+
+async def ensure_user(user_id: str):
+    """Поки база ще вантажиться, дочитує одного користувача окремим запитом.
+
+    False — дані користувача невідомі (запит не вдався): змінювати їх не можна,
+    інакше порожній запис перезапише в базі збережені черги. Наступний виклик
+    спробує ще раз."""
+    if loaded.is_set() or _uid(user_id) in users:
+        return True
     try:
-        supabase.table("users").upsert(data).execute()
+        response = await asyncio.to_thread(
+            lambda: get_client().table("users").select("*").eq("user_id", str(user_id)).execute()
+        )
     except Exception as e:
-        print(f"❌ Помилка збереження в DB для {user_id}: {e}")
+        print(f"❌ Помилка читання користувача {user_id}: {e}")
+        # Поки читали, таблицю могли дочитати у фоні
+        return loaded.is_set()
+    _apply_rows(response.data)
+    return True
+
+def _upsert_users(rows):
+    for i in range(0, len(rows), UPSERT_CHUNK):
+        get_client().table("users").upsert(rows[i:i + UPSERT_CHUNK]).execute()
+
+# Зміни користувачів не пишуться в базу з обробника: вони зливаються по
+# user_id і йдуть пачкою з фонового завдання (запускає bot.main)
+user_writer = WriteBehind(_upsert_users, interval=USERS_FLUSH_INTERVAL, name="користувачі")
+
+def save_user_to_db(user_id):
+    """Ставить дані користувача в чергу на збереження в Supabase (не блокує)"""
+    record = users.get(_uid(user_id))
+    if record is not None:
+        user_writer.put(record.user_id, record.to_row())
+
+# --------- ІНДЕКС ПІДПИСНИКІВ ---------
+
+def _unindex(user_id: int, queue: str):
+    key = normalize_queue(queue)
+    subscribers = queue_subscribers.get(key)
+    if subscribers is None:
+        return
+    subscribers.pop(user_id, None)
+    if not subscribers:
+        del queue_subscribers[key]
+
+def get_subscribers(queue: str):
+    """{user_id: Subscription} для черги"""
+    return queue_subscribers.get(normalize_queue(queue), {})
 
 # --------- ФУНКЦІЇ ЧЕРГ ---------
 
-def get_queues(user_id: str):
-    return user_queues.get(str(user_id), [])
+def get_queues(user_id):
+    record = users.get(_uid(user_id))
+    return record.queues if record else []
 
-def add_queue(user_id: str, queue: str, name: str):
-    user_id = str(user_id)
-    if user_id not in user_queues:
-        user_queues[user_id] = []
+def add_queue(user_id, queue: str, name: str):
+    uid = _uid(user_id)
+    record = users.get(uid)
+    if record is None:
+        record = users[uid] = UserRecord(uid)
 
-    for q in user_queues[user_id]:
-        if q["queue"] == queue:
+    # "4,1" і "4.1" — та сама черга: в індексі вони мають один ключ
+    key = normalize_queue(queue)
+    for q in record.queues:
+        if normalize_queue(q.queue) == key:
             return False
 
-    user_queues[user_id].append({"queue": queue, "name": name})
-    save_user_to_db(user_id) # Замість запису у файл
+    record.add(queue, name)
+    save_user_to_db(uid) # Замість запису у файл
     return True
 
-def remove_queue(user_id: str, queue: str):
-    user_id = str(user_id)
-    if user_id not in user_queues:
+def remove_queue(user_id, queue: str):
+    record = users.get(_uid(user_id))
+    if record is None:
         return False
 
-    original_len = len(user_queues[user_id])
-    user_queues[user_id] = [q for q in user_queues[user_id] if q["queue"] != queue]
+    key = normalize_queue(queue)
+    original_len = len(record.queues)
+    record.queues = [q for q in record.queues if normalize_queue(q.queue) != key]
 
-    if len(user_queues[user_id]) == original_len:
+    if len(record.queues) == original_len:
         return False 
 
-    save_user_to_db(user_id)
+    _unindex(record.user_id, queue)
+    save_user_to_db(record.user_id)
     return True
 
 # --------- ФУНКЦІЇ СПОВІЩЕНЬ ---------
 
-def get_notify_time(user_id: str, default: int = 30):
-    return int(user_notify_time.get(str(user_id), default))
-
-def set_notify_time(user_id: str, minutes: int):
-    user_id = str(user_id)
-    user_notify_time[user_id] = minutes
-    save_user_to_db(user_id)
+def get_notify_time(user_id, default: int = DEFAULT_NOTIFY_TIME):
+    record = users.get(_uid(user_id))
+    return record.notify_time if record else default
+
+def set_notify_time(user_id, minutes: int):
+    uid = _uid(user_id)
+    record = users.get(uid)
+    if record is None:
+        record = users[uid] = UserRecord(uid)
+    # Підписки в індексі посилаються на запис, тож оновлювати їх не треба
+    record.notify_time = minutes
+    save_user_to_db(uid)
 
 # Функції для сумісності (якщо вони десь викликаються)
 def save_queues(): pass
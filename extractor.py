@@ -0,0 +1,155 @@
+from html.parser import HTMLParser
+from typing import NamedTuple
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from config import PARSER_BACKEND
+
+try:
+    import lxml.html
+except ImportError:  # lxml необов'язковий — без нього працює потоковий бекенд
+    lxml = None
+
+# Кожен бекенд: html -> {post_id: Post}. Текст збирається так само, як
+# BeautifulSoup.get_text("\n"): усі текстові вузли через перенос рядка.
+
+class Post(NamedTuple):
+    text: str
+    published: str = None  # ISO-час публікації з <time datetime="...">
+
+def _post_id(data_post):
+    try:
+        return int(data_post.rsplit("/", 1)[-1])
+    except ValueError:
+        return None
+
+# --------- BeautifulSoup ---------
+
+def _soup_posts(soup):
+    result = {}
+    for msg in soup.find_all("div", attrs={"data-post": True}):
+        # js-message_text — сам пост; у цитаті відповіді клас js-message_reply_text
+        text_div = msg.find("div", class_="js-message_text") or msg.find("div", class_="tgme_widget_message_text")
+        post_id = _post_id(msg["data-post"])
+        if text_div is None or post_id is None:
+            continue
+        time_tag = msg.find("time", datetime=True)
+        result[post_id] = Post(text_div.get_text("\n").strip(), time_tag["datetime"] if time_tag else None)
+    return result
+
+def extract_soup(html: str):
+    """Повний DOM через html.parser — найповільніший, але еталонний варіант"""
+    return _soup_posts(BeautifulSoup(html, "html.parser"))
+
+def extract_strainer(html: str):
+    """BeautifulSoup будує дерево лише для блоків постів"""
+    only_posts = SoupStrainer("div", attrs={"data-post": True})
+    return _soup_posts(BeautifulSoup(html, "html.parser", parse_only=only_posts))
+
+# --------- lxml ---------
+
+def extract_lxml(html: str):
+    """C-парсер lxml: швидкий, якщо пакет встановлено"""
+    result = {}
+    root = lxml.html.fromstring(html)
+    for msg in root.xpath('//div[@data-post]'):
+        text_divs = (msg.xpath('.//div[contains(concat(" ", @class, " "), " js-message_text ")]')
+                     or msg.xpath('.//div[contains(concat(" ", @class, " "), " tgme_widget_message_text ")]'))
+        post_id = _post_id(msg.get("data-post"))
+        if not text_divs or post_id is None:
+            continue
+        published = msg.xpath('.//time/@datetime')
+        result[post_id] = Post("\n".join(text_divs[0].itertext()).strip(), published[0] if published else None)
+    return result
+
+# --------- Потоковий токенізатор ---------
+
+class _PostTextParser(HTMLParser):
+    """Проходить по тегах без побудови дерева й запам'ятовує лише текст постів"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.result = {}
+        self._post_id = None
+        self._post_depth = 0   # глибина div усередині поточного data-post
+        self._text_depth = 0   # глибина div усередині тексту посту
+        self._fallback = False # текст з tgme_widget_message_text без js-message_text
+        self._chunks = None
+        self.published = {}
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "time" and self._post_id is not None and self._post_id not in self.published:
+            published = dict(attrs).get("datetime")
+            if published is not None:
+                self.published[self._post_id] = published
+            return
+        if tag != "div":
+            return
+        if self._post_id is None:
+            data_post = dict(attrs).get("data-post")
+            if data_post is not None:
+                self._post_id = _post_id(data_post)
+                self._post_depth = 1
+            return
+
+        self._post_depth += 1
+        if self._text_depth:
+            self._text_depth += 1
+            return
+        classes = (dict(attrs).get("class") or "").split()
+        if "js-message_text" in classes or ("tgme_widget_message_text" in classes and self._post_id not in self.result):
+            self._text_depth = 1
+            self._fallback = "js-message_text" not in classes
+            self._chunks = []
+
+    def handle_endtag(self, tag):
+        if tag != "div" or self._post_id is None:
+            return
+        if self._text_depth:
+            self._text_depth -= 1
+            if not self._text_depth:
+                text = "\n".join(self._chunks).strip()
+                if not self._fallback or self._post_id not in self.result:
+                    self.result[self._post_id] = text
+                self._chunks = None
+        self._post_depth -= 1
+        if not self._post_depth:
+            self._post_id = None
+
+    def handle_data(self, data):
+        if self._chunks is not None:
+            self._chunks.append(data)
+
+def extract_stream(html: str):
+    """Лише стандартна бібліотека: жодного DOM, тільки текст постів"""
+    parser = _PostTextParser()
+    parser.feed(html)
+    parser.close()
+    return {k: Post(v, parser.published.get(k)) for k, v in parser.result.items() if k is not None}
+
+BACKENDS = {
+    "html.parser": extract_soup,
+    "strainer": extract_strainer,
+    "stream": extract_stream,
+}
+if lxml is not None:
+    BACKENDS["lxml"] = extract_lxml
+
+def _pick_backend(name):
+    if name == "auto":
+        return "lxml" if "lxml" in BACKENDS else "stream"
+    if name not in BACKENDS:
+        print(f"⚠️ Невідомий бекенд парсера '{name}', використовую html.parser")
+        return "html.parser"
+    return name
+
+backend = _pick_backend(PARSER_BACKEND)
+
+def extract_posts(html: str):
+    """Повертає {post_id: Post} для всіх постів сторінки t.me/s"""
+    if backend != "html.parser":
+        try:
+            return BACKENDS[backend](html)
+        except Exception as e:
+            print(f"[Parser Error] Бекенд {backend} не впорався, fallback на html.parser: {e}")
+    return extract_soup(html)
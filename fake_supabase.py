@@ -0,0 +1,97 @@
+import threading
+from typing import NamedTuple
+
+# Мінімальна заміна клієнта Supabase в пам'яті: лише ті виклики, якими
+# користується бот (select/order/range/gt/lt/eq, upsert, delete). Для тестів і
+# запуску без мережі: data.set_client(FakeSupabase()).
+
+class FakeResponse(NamedTuple):
+    data: list
+
+class _Query:
+    def __init__(self, table, action, payload=None, on_conflict=None):
+        self._table = table
+        self._action = action
+        self._payload = payload
+        self._on_conflict = on_conflict
+        self._filters = []
+        self._range = None
+        self._order = []  # [(колонка, desc)], як у PostgREST: перша — головна
+
+    def eq(self, column, value):
+        self._filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def gt(self, column, value):
+        self._filters.append(lambda row: row.get(column) is not None and row[column] > value)
+        return self
+
+    def lt(self, column, value):
+        self._filters.append(lambda row: row.get(column) is not None and row[column] < value)
+        return self
+
+    def order(self, column, desc=False):
+        self._order.append((column, desc))
+        return self
+
+    def range(self, start, end):
+        self._range = (start, end)
+        return self
+
+    def execute(self):
+        with self._table.lock:
+            if self._action == "upsert":
+                return FakeResponse(self._table.upsert(self._payload, self._on_conflict))
+            rows = [row for row in self._table.rows.values() if all(f(row) for f in self._filters)]
+            if self._action == "delete":
+                matched = {id(row) for row in rows}
+                for key in [k for k, row in self._table.rows.items() if id(row) in matched]:
+                    del self._table.rows[key]
+                return FakeResponse(rows)
+            # Стабільне сортування від молодшої колонки до головної
+            for column, desc in reversed(self._order):
+                rows.sort(key=lambda row: row.get(column), reverse=desc)
+            if self._range is not None:
+                start, end = self._range
+                rows = rows[start:end + 1]
+            return FakeResponse([dict(row) for row in rows])
+
+class FakeTable:
+    def __init__(self, primary_key):
+        self.primary_key = primary_key
+        self.rows = {}  # ключ -> рядок, у порядку вставки
+        self.lock = threading.Lock()
+
+    def upsert(self, payload, on_conflict=None):
+        columns = on_conflict.split(",") if on_conflict else self.primary_key
+        payload = payload if isinstance(payload, list) else [payload]
+        for row in payload:
+            key = tuple(row[c] for c in columns)
+            self.rows[key] = {**self.rows.get(key, {}), **row}
+        return [dict(row) for row in payload]
+
+class _TableRef:
+    def __init__(self, table):
+        self._table = table
+
+    def select(self, columns="*"):
+        return _Query(self._table, "select")
+
+    def upsert(self, payload, on_conflict=None):
+        return _Query(self._table, "upsert", payload, on_conflict)
+
+    def delete(self):
+        return _Query(self._table, "delete")
+
+class FakeSupabase:
+    """Клієнт з тим самим ланцюжковим API, що й supabase.Client"""
+
+    PRIMARY_KEYS = {"users": ["user_id"], "bot_state": ["namespace", "key"]}
+
+    def __init__(self):
+        self.tables = {}
+
+    def table(self, name):
+        if name not in self.tables:
+            self.tables[name] = FakeTable(self.PRIMARY_KEYS.get(name, ["id"]))
+        return _TableRef(self.tables[name])
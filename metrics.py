@@ -0,0 +1,96 @@
+import time
+from contextlib import contextmanager
+
+# Реєстр метрик процесу. Гейджі обчислюються в момент читання,
+# тож модулі лише реєструють функцію, а не оновлюють значення вручну.
+# Лічильники й гістограми оновлюються на гарячому шляху, тому це
+# звичайні словники без блокувань: читач (/metrics) лише копіює їх.
+
+_gauges = {}      # name -> (опис, функція без аргументів, тип)
+_counters = {}    # name -> (опис, {мітки: значення})
+_histograms = {}  # name -> (опис, межі кошиків, {мітки: [лічильники кошиків..., сума, кількість]})
+
+# Секунди: від швидкого розбору сторінки до повільного циклу розсилки
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+def register_gauge(name: str, description: str, func, kind: str = "gauge"):
+    """kind="counter" — для значень, що лише ростуть і рахуються деінде (Broadcaster.stats)"""
+    _gauges[name] = (description, func, kind)
+
+def register_counter(name: str, description: str):
+    _counters.setdefault(name, (description, {}))
+
+def register_histogram(name: str, description: str, buckets=DEFAULT_BUCKETS):
+    _histograms.setdefault(name, (description, tuple(buckets), {}))
+
+def _labels(labels):
+    return tuple(sorted(labels.items())) if labels else ()
+
+def inc(name: str, value: float = 1, **labels):
+    values = _counters[name][1]
+    key = _labels(labels)
+    values[key] = values.get(key, 0) + value
+
+def observe(name: str, value: float, **labels):
+    _, buckets, series = _histograms[name]
+    key = _labels(labels)
+    counts = series.get(key)
+    if counts is None:
+        counts = series[key] = [0] * (len(buckets) + 2)
+    for i, bound in enumerate(buckets):
+        if value <= bound:
+            counts[i] += 1
+    counts[-2] += value
+    counts[-1] += 1
+
+@contextmanager
+def timer(name: str, **labels):
+    """with metrics.timer("..."): — тривалість блоку в гістограму"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+def collect():
+    """{name: поточне значення} для всіх зареєстрованих гейджів"""
+    result = {}
+    for name, (_, func, _) in _gauges.items():
+        try:
+            result[name] = func()
+        except Exception as e:
+            print(f"[Metrics Error] {name}: {e}")
+    return result
+
+# --------- Формат Prometheus ---------
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+def render():
+    """Усі метрики в текстовому форматі Prometheus (text/plain; version=0.0.4)"""
+    lines = []
+    values = collect()
+    for name, (description, _, kind) in list(_gauges.items()):
+        if name not in values or values[name] is None:
+            continue
+        lines += [f"# HELP {name} {description}", f"# TYPE {name} {kind}", f"{name} {values[name]}"]
+
+    for name, (description, series) in list(_counters.items()):
+        lines += [f"# HELP {name} {description}", f"# TYPE {name} counter"]
+        lines += [f"{name}{_format_labels(key)} {value}" for key, value in list(series.items())]
+
+    for name, (description, buckets, series) in list(_histograms.items()):
+        lines += [f"# HELP {name} {description}", f"# TYPE {name} histogram"]
+        for key, counts in list(series.items()):
+            counts = list(counts)
+            for bound, count in zip(buckets, counts):
+                lines.append(f"{name}_bucket{_format_labels(key, [('le', bound)])} {count}")
+            lines.append(f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {counts[-1]}")
+            lines.append(f"{name}_sum{_format_labels(key)} {counts[-2]}")
+            lines.append(f"{name}_count{_format_labels(key)} {counts[-1]}")
+    return "\n".join(lines) + "\n"
@@ -1,28 +1,172 @@
+import asyncio
 import httpx
-from bs4 import BeautifulSoup
 import re
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import time
-from config import CHANNEL_URL
+from types import MappingProxyType
+from typing import NamedTuple
+from config import (
+    HTTP_TIMEOUT, HTTP_CONNECT_TIMEOUT, HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE, HTTP_KEEPALIVE_EXPIRY, HTTP2, SOURCE_WAIT_TIMEOUT, FULL_REFRESH_INTERVAL
+)
+from extractor import Post, extract_posts
+from sources import SOURCES, QUEUE_SEP, Source, qualify
+from timeline import Timeline, to_minutes
+import metrics
 
-async def get_last_posts(limit=10):
-    # Додаємо мітку часу, щоб Telegram не видавав закешовану сторінку
-    url = f"https://t.me/s/{CHANNEL_URL.split('/')[-1]}?t={int(time.time())}"
-    headers = {"User-Agent": "Mozilla/5.0"}
-    
-    async with httpx.AsyncClient(headers=headers, follow_redirects=True) as client:
-        try:
-            r = await client.get(url, timeout=10.0)
-            r.raise_for_status()
-            soup = BeautifulSoup(r.text, "html.parser")
-            posts = soup.find_all("div", class_="tgme_widget_message_text")
-            return [p.get_text("\n").strip() for p in posts[-limit:]]
-        except (httpx.ConnectError, httpx.HTTPStatusError, httpx.TimeoutException) as e:
-            print(f"[Network Error] Немає зв'язку з Telegram: {e}")
-            return[]
-        except Exception as e:
-            print(f"[Parser Error] {e}")
-            return []
+SNAPSHOT_TTL = 60  # секунд: скільки живе закешований знімок каналу
+POSTS_KEEP = 20  # скільки останніх постів тримаємо в пам'яті
+POLL_SLACK = 5  # секунд: запас на неточність планувальника при перевірці за розкладом джерела
+
+# --------- HTTP-КЛІЄНТ ---------
+
+try:
+    import h2  # noqa: F401  — без h2 httpx не вміє HTTP/2
+    _http2 = HTTP2
+except ImportError:
+    _http2 = False
+
+_client = None
+
+def get_http_client():
+    """Один клієнт на весь процес: з'єднання з t.me перевикористовується між запитами"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            headers={"User-Agent": "Mozilla/5.0"},
+            follow_redirects=True,
+            http2=_http2,
+            timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+    return _client
+
+async def close_http_client():
+    """Закриває пул з'єднань (викликається при зупинці бота)"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+# --------- ЗАВАНТАЖЕННЯ КАНАЛУ ---------
+
+metrics.register_histogram("channel_fetch_seconds", "Тривалість запиту сторінки каналу")
+metrics.register_counter("channel_fetch_total", "Запити сторінки каналу за результатом")
+metrics.register_counter("channel_fetch_bytes_total", "Отримано байтів зі сторінок каналу")
+metrics.register_histogram("channel_parse_seconds", "Розбір сторінки каналу на пости")
+metrics.register_counter("snapshot_requests_total",
+                         "Звернення до знімка: hit — з кешу, stale — з кешу з фоновим оновленням, shared — чекали чужий запит")
+metrics.register_counter("post_index_cache_total", "Кеш індексів постів")
+metrics.register_counter("timeline_cache_total", "Кеш таймлайнів у знімку")
+
+class ChannelState:
+    """Що вже відомо про канал: пости за id та валідатори HTTP-кешу"""
+
+    def __init__(self, page: str, name: str = "default"):
+        self.page = page       # https://t.me/s/<канал>
+        self.name = name       # мітка джерела в метриках
+        self.posts = {}        # post_id -> Post(текст, час публікації)
+        self.last_id = None    # найбільший побачений data-post
+        self.validators = {}   # "full"/"after" -> (url, etag, last_modified, хеш тіла)
+        self.full_at = 0.0
+        self.version = 0       # зростає лише коли змінився текст постів
+
+    def latest(self, limit):
+        return [self.posts[i] for i in sorted(self.posts)[-limit:]]
+
+    def texts(self, limit):
+        return [post.text for post in self.latest(limit)]
+
+    def merge(self, new_posts, replace=False):
+        posts = {} if replace else dict(self.posts)
+        posts.update(new_posts)
+        for post_id in sorted(posts)[:-POSTS_KEEP]:
+            del posts[post_id]
+        if posts != self.posts:
+            self.posts = posts
+            self.version += 1
+        if posts:
+            self.last_id = max(self.last_id or 0, max(posts))
+
+async def fetch_channel(state: ChannelState):
+    """Дочитує канал: лише нові пости (?after=), повністю — раз на FULL_REFRESH_INTERVAL.
+    Повертає True, якщо текст постів змінився."""
+    # POLL_SLACK: перевірка за розкладом може прийти трохи раніше за інтервал
+    full = state.last_id is None or time.monotonic() - state.full_at >= FULL_REFRESH_INTERVAL - POLL_SLACK
+    kind = "full" if full else "after"
+    url = state.page if full else f"{state.page}?after={state.last_id}"
+
+    headers = {}
+    cached_url, etag, last_modified, body_hash = state.validators.get(kind, (None, None, None, None))
+    if cached_url == url:
+        if etag: headers["If-None-Match"] = etag
+        if last_modified: headers["If-Modified-Since"] = last_modified
+
+    try:
+        with metrics.timer("channel_fetch_seconds", source=state.name, kind=kind):
+            r = await get_http_client().get(url, headers=headers)
+    except Exception:
+        metrics.inc("channel_fetch_total", source=state.name, result="error")
+        raise
+    metrics.inc("channel_fetch_bytes_total", len(r.content), source=state.name)
+    if r.status_code == 304:
+        metrics.inc("channel_fetch_total", source=state.name, result="not_modified")
+        if full: state.full_at = time.monotonic()
+        return False
+    if r.is_error:
+        metrics.inc("channel_fetch_total", source=state.name, result="error")
+    r.raise_for_status()
+    if full:
+        state.full_at = time.monotonic()
+
+    new_hash = hash(r.content)
+    state.validators[kind] = (url, r.headers.get("ETag"), r.headers.get("Last-Modified"), new_hash)
+    if cached_url == url and new_hash == body_hash:
+        metrics.inc("channel_fetch_total", source=state.name, result="unchanged")
+        return False  # Сторінка не змінилася — парсити нічого
+
+    metrics.inc("channel_fetch_total", source=state.name, result="parsed")
+    version = state.version
+    with metrics.timer("channel_parse_seconds", source=state.name):
+        posts = extract_posts(r.text)
+    state.merge(posts, replace=full)
+    return state.version != version
+
+async def get_last_posts(limit=10, state: ChannelState = None):
+    state = state or _feeds[""].channel
+    try:
+        await fetch_channel(state)
+        return state.texts(limit)
+    except (httpx.ConnectError, httpx.HTTPStatusError, httpx.TimeoutException) as e:
+        print(f"[Network Error] Немає зв'язку з Telegram: {e}")
+        return[]
+    except Exception as e:
+        print(f"[Parser Error] {e}")
+        return []
+
+# Попередньо скомпільовані шаблони: компілюються один раз на модуль
+TIME_RANGE_RE = re.compile(r"(\d{1,2}[:.]\d{2})\s*[-–—]\s*(\d{1,2}[:.]\d{2})")
+# Номер черги як окремий токен: "4.1" не збігається всередині "14.1" чи "18.10"
+QUEUE_ID_RE = re.compile(r"(?<![\d:])(?<!\d\.)(\d{1,2}(?:\.\d)?)(?!\d|\.\d)")
+DATE_RE = re.compile(r"(?<!\d)(\d{2})\.(\d{2})(?!\d)")
+
+class ParserRules(NamedTuple):
+    """Шаблони розбору постів; джерело може мати власні"""
+    time_re: re.Pattern = TIME_RANGE_RE
+    queue_re: re.Pattern = QUEUE_ID_RE
+
+    @classmethod
+    def for_source(cls, source: Source):
+        return cls(
+            re.compile(source.time_pattern) if source.time_pattern else TIME_RANGE_RE,
+            re.compile(source.queue_pattern) if source.queue_pattern else QUEUE_ID_RE,
+        )
+
+DEFAULT_RULES = ParserRules()
 
 def normalize_time(t_str):
     """Додає нуль попереду, якщо час типу 8:00 -> 08:00"""
@@ -31,83 +175,498 @@ def normalize_time(t_str):
         t_str = "0" + t_str
     return t_str
 
-def extract_date_info(text):
-    now = datetime.now()
-    match = re.search(r"(\d{2})\.(\d{2})", text)
-    
+def normalize_queue(queue: str):
+    """Приводить номер черги до ключа індексу: ' 4,1 ' -> '4.1', 'Lviv:4,1' -> 'lviv:4.1'"""
+    source_key, sep, local = queue.strip().rpartition(QUEUE_SEP)
+    local = local.strip().replace(",", ".")
+    return qualify(source_key.strip().lower(), local) if sep else local
+
+def parse_date_ref(text, time_re: re.Pattern = TIME_RANGE_RE):
+    """Витягує з посту дату (день, місяць) або ключове слово 'завтра'/'сьогодні'"""
+    # Час з крапкою ("08.00-10.00") має той самий вигляд, що й дата: інтервали прибираємо
+    match = DATE_RE.search(time_re.sub(" ", text))
     if match:
-        day, month = map(int, match.groups())
-        try:
-            target_date = datetime(now.year, month, day)
-            if target_date.month == 1 and now.month == 12:
-                target_date = target_date.replace(year=now.year + 1)
-                
-            if target_date.date() == now.date():
-                return f"сьогодні ({day:02d}.{month:02d})"
-            elif target_date.date() == (now.date() + timedelta(days=1)):
-                return f"ЗАВТРА ({day:02d}.{month:02d})"
-            else:
-                return f"{day:02d}.{month:02d}"
-        except:
-            return f"{day:02d}.{month:02d}"
-        
-    if "завтра" in text.lower(): return "ЗАВТРА"
-    if "сьогодні" in text.lower(): return "сьогодні"
+        return tuple(map(int, match.groups()))
+    if "завтра" in text.lower(): return "завтра"
     return "сьогодні"
 
-async def get_queue_data(queue: str):
-    posts = await get_last_posts()
-    for text in reversed(posts):
-        lines = text.split('\n')
-        for line in lines:
-            if queue in line:
-                times = re.findall(r"(\d{1,2}[:.]\d{2})\s*[-–—]\s*(\d{1,2}[:.]\d{2})", line)
-                if times:
-                    intervals = [(normalize_time(s), normalize_time(e)) for s, e in times]
-                    return intervals, text # Повертаємо і графік, і текст посту
-    return None, None
-
-async def get_queue_intervals(queue: str):
-    posts = await get_last_posts()
-    for text in reversed(posts):
-        # Шукаємо номер черги і все, що йде після нього до наступної черги або кінця
-        lines = text.split('\n')
-        for line in lines:
-            if queue in line:
-                # Шукаємо всі часові пари 00:00-00:00 у цьому рядку
-                times = re.findall(r"(\d{1,2}[:.]\d{2})\s*[-–—]\s*(\d{1,2}[:.]\d{2})", line)
-                if times:
-                    return [(normalize_time(s), normalize_time(e)) for s, e in times]
-    return None
-
-async def calculate_stats(queue: str):
-    intervals, full_text = await get_queue_data(queue)
-    if not intervals: return None
-
-    total_off_min = 0
-    for s_str, e_str in intervals:
+def resolve_date(date_ref, now=None):
+    """Календарна дата, до якої відноситься пост, або None, якщо дата некоректна"""
+    now = now or datetime.now()
+    if date_ref == "завтра": return now.date() + timedelta(days=1)
+    if date_ref == "сьогодні": return now.date()
+
+    day, month = date_ref
+    try:
+        target_date = date(now.year, month, day)
+    except ValueError:
+        return None
+    if target_date.month == 1 and now.month == 12:
+        target_date = target_date.replace(year=now.year + 1)
+    return target_date
+
+def format_date_label(date_ref, now=None):
+    """Формує підпис дати відносно поточного дня"""
+    now = now or datetime.now()
+    if date_ref == "завтра": return "ЗАВТРА"
+    if date_ref == "сьогодні": return "сьогодні"
+
+    day, month = date_ref
+    target_date = resolve_date(date_ref, now)
+    if target_date == now.date():
+        return f"сьогодні ({day:02d}.{month:02d})"
+    elif target_date == (now.date() + timedelta(days=1)):
+        return f"ЗАВТРА ({day:02d}.{month:02d})"
+    return f"{day:02d}.{month:02d}"
+
+def format_day_label(day: date, now=None):
+    """Підпис для відомої календарної дати"""
+    today = (now or datetime.now()).date()
+    if day == today:
+        return f"сьогодні ({day:%d.%m})"
+    elif day == today + timedelta(days=1):
+        return f"ЗАВТРА ({day:%d.%m})"
+    return f"{day:%d.%m}"
+
+def parse_published(published):
+    """ISO-час публікації посту -> локальний naive datetime (як datetime.now())"""
+    if not published:
+        return None
+    try:
+        return datetime.fromisoformat(published).astimezone().replace(tzinfo=None)
+    except ValueError:
+        return None
+
+def resolve_start(date_ref, t_str, now=None):
+    """Момент початку інтервалу з урахуванням дати посту"""
+    now = now or datetime.now()
+    day = resolve_date(date_ref, now)
+    if day is None:
+        # Дата в пості не розпізнана: найближчий такий час не раніше ніж 12 год тому
+        day = now.date()
+        start_dt = datetime.combine(day, datetime.min.time()) + timedelta(minutes=to_minutes(t_str))
+        if start_dt < now - timedelta(hours=12):
+            start_dt += timedelta(days=1)
+        return start_dt
+    return datetime.combine(day, datetime.min.time()) + timedelta(minutes=to_minutes(t_str))
+
+def extract_date_info(text):
+    return format_date_label(parse_date_ref(text))
+
+# --------- ІНДЕКС ПОСТІВ ---------
+
+class QueueEntry(NamedTuple):
+    """Графік однієї черги з конкретного посту"""
+    intervals: tuple
+    text: str
+    date_ref: object
+    day: date = None  # календарна дата графіка, якщо відомий час публікації
+
+    @property
+    def label(self):
+        return format_day_label(self.day) if self.day else format_date_label(self.date_ref)
+
+def index_post(text: str, published: str = None, rules: ParserRules = DEFAULT_RULES):
+    """Один прохід по посту: черга -> інтервали (перший рядок з часом виграє)"""
+    date_ref = parse_date_ref(text, rules.time_re)
+    # "завтра"/"сьогодні" і рік рахуються від дня публікації, а не від поточного
+    published_at = parse_published(published)
+    day = None
+    if published_at is not None:
+        day = resolve_date(date_ref, published_at) or published_at.date()
+    index = {}
+    for line in text.split('\n'):
+        times = rules.time_re.findall(line)
+        if not times:
+            continue
+        # Номер черги стоїть перед першим інтервалом ("Черга 4.1: 08:00-10:00 (2 год)"):
+        # числа після нього — тривалості й примітки, а не черги
+        head = line[:rules.time_re.search(line).start()]
+        queue_ids = rules.queue_re.findall(head)
+        if not queue_ids:
+            continue
+        intervals = tuple((normalize_time(s), normalize_time(e)) for s, e in times)
+        for q in queue_ids:
+            if q not in index:
+                index[q] = QueueEntry(intervals, text, date_ref, day)
+    return index
+
+class PostIndexer:
+    """Індекси постів одного джерела: перебудовуються лише для постів, що змінилися"""
+
+    def __init__(self, rules: ParserRules = DEFAULT_RULES):
+        self.rules = rules
+        self._cache = {}  # Post -> {черга: QueueEntry}
+
+    def __call__(self, post: Post):
+        post_index = self._cache.get(post)
+        if post_index is None:
+            metrics.inc("post_index_cache_total", result="miss")
+            post_index = self._cache[post] = index_post(post.text, post.published, self.rules)
+        else:
+            metrics.inc("post_index_cache_total", result="hit")
+        return post_index
+
+    def build(self, posts):
+        """Зливає індекси постів: новіший пост має пріоритет над старішим"""
+        cache = {}
+        merged = {}
+        for post in reversed(posts):
+            post_index = cache[post] = self(post)
+            for q, entry in post_index.items():
+                if q not in merged:
+                    merged[q] = entry
+        self._cache = cache
+        return MappingProxyType(merged)
+
+# --------- ГРАФІКИ ПО ДНЯХ ---------
+
+class ScheduleStore:
+    """Графіки по календарних днях: день -> черга -> QueueEntry.
+
+    Оновлюється інкрементально: пост розбирається лише коли з'явився або
+    змінився. Історія за keep_days днів зберігається навіть після того, як
+    пост зник зі сторінки каналу. Для одного дня й черги діє найновіший пост."""
+
+    def __init__(self, keep_days: int = 7, indexer: PostIndexer = None):
+        self.keep_days = keep_days
+        self.indexer = indexer or PostIndexer()
+        self._candidates = {}  # день -> черга -> {post_id: QueueEntry}
+        self._applied = {}     # post_id -> Post, вже враховані
+        self._contrib = {}     # post_id -> [(день, черга)], щоб відкотити редагований пост
+        self._views = {}       # день -> MappingProxyType, перебудовується лише для змінених днів
+
+    def apply(self, posts, today: date = None):
+        """Враховує нові й відредаговані пости; повертає множину змінених днів"""
+        changed = set()
+        for post_id in sorted(posts):
+            post = posts[post_id]
+            if self._applied.get(post_id) == post:
+                continue
+            changed |= self._retract(post_id)
+            contrib = []
+            for queue, entry in self.indexer(post).items():
+                if entry.day is None:
+                    continue
+                self._candidates.setdefault(entry.day, {}).setdefault(queue, {})[post_id] = entry
+                contrib.append((entry.day, queue))
+                changed.add(entry.day)
+            self._applied[post_id] = post
+            self._contrib[post_id] = contrib
+
+        # Пам'ятаємо лише пости, які ще можуть бути відредаговані (є на сторінці)
+        for post_id in [p for p in self._applied if p not in posts]:
+            del self._applied[post_id]
+            del self._contrib[post_id]
+
+        changed |= self._prune(today or date.today())
+        for day in changed:
+            self._rebuild_view(day)
+        return changed
+
+    def _retract(self, post_id):
+        days = set()
+        for day, queue in self._contrib.pop(post_id, []):
+            queues = self._candidates.get(day)
+            if not queues or queue not in queues:
+                continue
+            queues[queue].pop(post_id, None)
+            if not queues[queue]:
+                del queues[queue]
+            days.add(day)
+        return days
+
+    def _prune(self, today):
+        old = [d for d in self._candidates if d < today - timedelta(days=self.keep_days)]
+        for day in old:
+            del self._candidates[day]
+        return set(old)
+
+    def _rebuild_view(self, day):
+        queues = self._candidates.get(day)
+        if not queues:
+            self._candidates.pop(day, None)
+            self._views.pop(day, None)
+            return
+        self._views[day] = MappingProxyType({q: cands[max(cands)] for q, cands in queues.items()})
+
+    def view(self):
+        """Незмінний зріз для знімка: день -> {черга: QueueEntry}"""
+        return MappingProxyType(dict(self._views))
+
+# --------- ПОРІВНЯННЯ ГРАФІКІВ ---------
+
+class IntervalDiff(NamedTuple):
+    """Чим новий графік дня відрізняється від попереднього"""
+    added: tuple    # (("HH:MM", "HH:MM"), ...)
+    removed: tuple
+    shifted: tuple  # ((старий інтервал, новий інтервал), ...)
+
+    @property
+    def changed(self):
+        return bool(self.added or self.removed or self.shifted)
+
+def _span(interval):
+    start, end = to_minutes(interval[0]), to_minutes(interval[1])
+    return start, end + 1440 if end <= start else end
+
+def diff_intervals(old, new):
+    """Структурне порівняння двох графіків одного дня.
+
+    Інтервал, що перекривається з прибраним, вважається зсунутим, а не
+    новим: "08:00-10:00" -> "09:00-11:00" — це один зсув, а не дві зміни."""
+    old, new = tuple(map(tuple, old)), tuple(map(tuple, new))
+    removed = [i for i in old if i not in new]
+    added = [i for i in new if i not in old]
+    shifted = []
+    for before in list(removed):
+        b_start, b_end = _span(before)
+        for after in added:
+            a_start, a_end = _span(after)
+            if a_start < b_end and b_start < a_end:
+                shifted.append((before, after))
+                removed.remove(before)
+                added.remove(after)
+                break
+    return IntervalDiff(tuple(added), tuple(removed), tuple(shifted))
+
+# --------- ЗНІМОК КАНАЛУ ---------
+
+class ScheduleSnapshot(NamedTuple):
+    """Незмінний знімок каналу: один запит і один парсинг на весь цикл"""
+    posts: tuple
+    fetched_at: float
+    index: MappingProxyType
+    version: int = -1
+    timelines: dict = None  # (черга, день[, "day"]) -> Timeline, заповнюється ліниво
+    days: MappingProxyType = MappingProxyType({})  # день -> {черга: QueueEntry}
+
+EMPTY_SNAPSHOT = ScheduleSnapshot((), 0.0, MappingProxyType({}), -1, {})
+
+class SourceFeed:
+    """Усе, що кешується для одного джерела: пости, індекси, знімок"""
+
+    def __init__(self, source: Source):
+        self.source = source
+        self.channel = ChannelState(source.page, source.key or "default")
+        self.indexer = PostIndexer(ParserRules.for_source(source))
+        self.store = ScheduleStore(indexer=self.indexer)
+        self.snapshot = None
+        self.inflight = None
+
+    async def _refresh(self):
+        channel = self.channel
+        started = time.monotonic()  # вік знімка рахується від запиту, а не від відповіді
+        try:
+            posts = await get_last_posts(state=channel)
+            if posts and self.snapshot is not None and self.snapshot.version == channel.version:
+                # Канал не змінився — лише подовжуємо життя знімка, без перебудови індексу
+                self.snapshot = self.snapshot._replace(fetched_at=started)
+            elif posts:
+                posts = tuple(channel.latest(len(posts)))
+                # Сховище по днях бачить усі пости сторінки, а не лише останні
+                self.store.apply(channel.posts)
+                self.snapshot = ScheduleSnapshot(posts, started, self.indexer.build(posts), channel.version, {},
+                                                 self.store.view())
+            elif self.snapshot is None:
+                return EMPTY_SNAPSHOT._replace(fetched_at=started)
+            # Якщо канал недоступний — віддаємо попередній знімок
+            return self.snapshot
+        finally:
+            self.inflight = None
+
+    async def get_snapshot(self, max_age: float = None, stale_window: float = 0):
+        """Знімок джерела; паралельні виклики чекають на один і той самий запит.
+
+        Знімок, старший за max_age, але молодший за stale_window, віддається
+        одразу, а оновлення запускається у фоні (stale-while-revalidate)."""
+        if max_age is None:
+            max_age = self.source.poll_interval - POLL_SLACK
+        name = self.channel.name
+        age = time.monotonic() - self.snapshot.fetched_at if self.snapshot is not None else None
+        if age is not None and age < max_age:
+            metrics.inc("snapshot_requests_total", source=name, result="hit")
+            return self.snapshot
+        if age is not None and age < stale_window:
+            metrics.inc("snapshot_requests_total", source=name, result="stale")
+            if self.inflight is None:
+                self.inflight = asyncio.ensure_future(self._refresh())
+            return self.snapshot
+        if self.inflight is None:
+            metrics.inc("snapshot_requests_total", source=name, result="miss")
+            self.inflight = asyncio.ensure_future(self._refresh())
+        else:
+            metrics.inc("snapshot_requests_total", source=name, result="shared")
+        # shield: скасування одного обробника не зриває запит для інших
+        return await asyncio.shield(self.inflight)
+
+    async def get_snapshot_or_stale(self, max_age: float = None, stale_window: float = 0):
+        """Не чекає повільний канал довше SOURCE_WAIT_TIMEOUT: запит іде далі у фоні"""
         try:
-            # Обробка 24:00 вручну
-            s_h, s_m = map(int, s_str.split(':'))
-            if e_str.startswith("24"):
-                e_h, e_m = 24, 0
-            else:
-                e_h, e_m = map(int, e_str.split(':'))
-            
-            duration = (e_h * 60 + e_m) - (s_h * 60 + s_m)
-            if duration < 0: duration += 1440 # Якщо перехід через ніч
-            
-            total_off_min += duration
-        except: continue
+            return await asyncio.wait_for(self.get_snapshot(max_age, stale_window), SOURCE_WAIT_TIMEOUT)
+        except asyncio.TimeoutError:
+            print(f"[Network Error] Джерело {self.source.key or 'основне'} відповідає повільно, беру попередній знімок")
+            return self.snapshot or EMPTY_SNAPSHOT
+
+_feeds = {key: SourceFeed(source) for key, source in SOURCES.items()}
+metrics.register_gauge("channel_posts", "Постів у пам'яті по всіх джерелах",
+                       lambda: sum(len(f.channel.posts) for f in _feeds.values()))
+metrics.register_gauge("schedule_days", "Днів у сховищах графіків по всіх джерелах",
+                       lambda: sum(len(f.store._views) for f in _feeds.values()))
+_merged = ((), None)  # (знімки джерел, зведений знімок)
+
+def _merge(parts):
+    """Зводить знімки джерел в один з черговими ключами виду 'джерело:черга'"""
+    global _merged
+    cached_parts, merged = _merged
+    if merged is not None and len(cached_parts) == len(parts) and all(
+        a.index is b.index and a.days is b.days for a, b in zip(cached_parts, parts)
+    ):
+        return merged._replace(fetched_at=min(p.fetched_at for p in parts))
+
+    index, days = {}, {}
+    for key, part in zip(_feeds, parts):
+        index.update((qualify(key, q), entry) for q, entry in part.index.items())
+        for day, queues in part.days.items():
+            days.setdefault(day, {}).update((qualify(key, q), entry) for q, entry in queues.items())
+    merged = ScheduleSnapshot(
+        tuple(post for part in parts for post in part.posts),
+        min(p.fetched_at for p in parts),
+        MappingProxyType(index),
+        sum(p.version for p in parts),
+        {},
+        MappingProxyType({day: MappingProxyType(queues) for day, queues in days.items()}),
+    )
+    _merged = (tuple(parts), merged)
+    return merged
+
+async def get_snapshot(max_age: float = SNAPSHOT_TTL, stale_window: float = 0):
+    """Зведений знімок усіх джерел. max_age=None — кожне джерело за своїм poll_interval.
+    stale_window — див. SourceFeed.get_snapshot.
+
+    Канали читаються паралельно через спільний пул з'єднань; повільний або
+    недоступний канал не затримує решту — для нього береться попередній знімок."""
+    feeds = list(_feeds.values())
+    if len(feeds) == 1 and feeds[0].source.key == "":
+        return await feeds[0].get_snapshot(max_age, stale_window)  # Одне джерело: зводити нічого
+    parts = await asyncio.gather(*(feed.get_snapshot_or_stale(max_age, stale_window) for feed in feeds))
+    return _merge(parts)
+
+def min_poll_interval():
+    """Як часто має запускатися перевірка, щоб кожне джерело опитувалося вчасно"""
+    return min(source.poll_interval for source in SOURCES.values())
+
+# --------- ПОШУК ЧЕРГИ ---------
+
+def find_latest_entry(snapshot: ScheduleSnapshot, queue: str):
+    """Графік черги з найновішого посту, незалежно від дати"""
+    return snapshot.index.get(normalize_queue(queue))
+
+def find_queue_entry(snapshot: ScheduleSnapshot, queue: str, day: date = None):
+    """Графік на день day; без day — на сьогодні, інакше на завтра, інакше найновіший"""
+    queue = normalize_queue(queue)
+    if day is not None:
+        return snapshot.days.get(day, {}).get(queue)
+    today = date.today()
+    for d in (today, today + timedelta(days=1)):
+        entry = snapshot.days.get(d, {}).get(queue)
+        if entry is not None:
+            return entry
+    return snapshot.index.get(queue)
+
+def find_queue_data(snapshot: ScheduleSnapshot, queue: str):
+    entry = find_queue_entry(snapshot, queue)
+    if entry is None:
+        return None, None
+    return entry.intervals, entry.text # Повертаємо і графік, і текст посту
+
+def upcoming_starts(snapshot: ScheduleSnapshot, queue: str, now=None):
+    """[('HH:MM', datetime)] початків вимкнень черги від сьогодні і далі"""
+    now = now or datetime.now()
+    queue = normalize_queue(queue)
+    starts = []
+    for day in sorted(d for d in snapshot.days if d >= now.date()):
+        entry = snapshot.days[day].get(queue)
+        if entry is None:
+            continue
+        midnight = datetime.combine(day, datetime.min.time())
+        starts.extend((s, midnight + timedelta(minutes=to_minutes(s))) for s, _ in entry.intervals)
+    if not starts:
+        # Пости без часу публікації: дата береться з тексту відносно сьогодні
+        entry = snapshot.index.get(queue)
+        if entry is not None and entry.day is None:
+            starts = [(s, resolve_start(entry.date_ref, s, now)) for s, _ in entry.intervals]
+    return starts
+
+def upcoming_entries(snapshot: ScheduleSnapshot, queue: str, now=None):
+    """[(день, QueueEntry)] графіків черги від сьогодні і далі"""
+    now = now or datetime.now()
+    queue = normalize_queue(queue)
+    entries = [(day, snapshot.days[day][queue]) for day in sorted(snapshot.days)
+               if day >= now.date() and queue in snapshot.days[day]]
+    if not entries:
+        entry = snapshot.index.get(queue)
+        if entry is not None and entry.day is None:
+            entries = [(resolve_date(entry.date_ref, now) or now.date(), entry)]
+    return entries
+
+def get_timeline(snapshot: ScheduleSnapshot, queue: str, now=None):
+    """Таймлайн черги (вчора, сьогодні, завтра): будується один раз на знімок і день"""
+    now = now or datetime.now()
+    today = now.date()
+    key = (normalize_queue(queue), today)
+    if key in snapshot.timelines:
+        metrics.inc("timeline_cache_total", result="hit")
+    else:
+        metrics.inc("timeline_cache_total", result="miss")
+        days = []
+        for offset in (-1, 0, 1):  # вчорашній інтервал через північ ще може тривати
+            day = today + timedelta(days=offset)
+            entry = find_queue_entry(snapshot, queue, day)
+            if entry is not None:
+                days.append((day, entry.intervals))
+        if not days:
+            entry = find_latest_entry(snapshot, queue)
+            if entry is not None:
+                days.append((entry.day or resolve_date(entry.date_ref, now) or today, entry.intervals))
+        snapshot.timelines[key] = Timeline.build(days) if days else None
+    return snapshot.timelines[key]
+
+async def get_queue_data(queue: str, snapshot: ScheduleSnapshot = None):
+    if snapshot is None:
+        snapshot = await get_snapshot()
+    return find_queue_data(snapshot, queue)
+
+async def get_queue_intervals(queue: str, snapshot: ScheduleSnapshot = None):
+    intervals, _ = await get_queue_data(queue, snapshot)
+    return intervals
+
+async def calculate_stats(queue: str, snapshot: ScheduleSnapshot = None):
+    if snapshot is None:
+        snapshot = await get_snapshot()
+    entry = find_queue_entry(snapshot, queue)
+    if entry is None: return None
+    day = entry.day or resolve_date(entry.date_ref) or date.today()
+    # Статистика — лише з інтервалів цього дня: у багатоденному таймлайні відрізки
+    # сусідніх днів зливаються опівночі й спотворили б суму та кількість
+    key = (normalize_queue(queue), day, "day")
+    if key not in snapshot.timelines:
+        snapshot.timelines[key] = Timeline.build([(day, entry.intervals)])
+    timeline = snapshot.timelines[key]
+    if not timeline: return None
+
+    total_off_min = min(timeline.total_off_minutes(day), 1440)
 
     off_h, off_m = divmod(int(total_off_min), 60)
     on_h, on_m = divmod(1440 - int(total_off_min), 60)
     
-    date_label = extract_date_info(full_text)
+    date_label = entry.label
 
     return {
         "total_off": f"{off_h} год {off_m} хв",
         "total_on": f"{on_h} год {on_m} хв",
-        "num_outages": len(intervals),
+        # Як і раніше — за інтервалами з посту: суміжні "08:00-10:00, 10:00-12:00"
+        # у таймлайні злиті в один відрізок, але в графіку це два вимкнення
+        "num_outages": len(entry.intervals),
         "date": date_label
     }
\ No newline at end of file
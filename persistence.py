@@ -0,0 +1,142 @@
+import asyncio
+import sqlite3
+import threading
+import time
+
+# Схема таблиці стану в Supabase:
+#   create table bot_state (
+#       namespace text not null,
+#       key text not null,
+#       value text,
+#       expires_at double precision not null,
+#       primary key (namespace, key)
+#   );
+
+PAGE_SIZE = 1000  # PostgREST за замовчуванням віддає не більше 1000 рядків
+UPSERT_CHUNK = 500
+
+# --------- БЕКЕНДИ СТАНУ ---------
+
+class SupabaseStateBackend:
+    """Стан бота в таблиці Supabase (синхронний клієнт — викликати з потоку)"""
+
+    def __init__(self, client, table: str = "bot_state"):
+        self.client = client
+        self.table = table
+
+    def load(self, now: float):
+        rows = []
+        start = 0
+        while True:
+            # Без сталого порядку сторінки можуть перекриватися чи пропускати рядки
+            response = (self.client.table(self.table).select("*").gt("expires_at", now)
+                        .order("namespace").order("key").range(start, start + PAGE_SIZE - 1).execute())
+            rows.extend(response.data)
+            if len(response.data) < PAGE_SIZE:
+                return rows
+            start += PAGE_SIZE
+
+    def save_many(self, rows):
+        for i in range(0, len(rows), UPSERT_CHUNK):
+            self.client.table(self.table).upsert(rows[i:i + UPSERT_CHUNK], on_conflict="namespace,key").execute()
+
+    def delete_expired(self, now: float):
+        self.client.table(self.table).delete().lt("expires_at", now).execute()
+
+class SqliteStateBackend:
+    """Локальна заміна Supabase для тестів і запуску без мережі"""
+
+    def __init__(self, path: str = ":memory:"):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self.conn:
+            self.conn.execute(
+                "create table if not exists bot_state ("
+                "namespace text not null, key text not null, value text, "
+                "expires_at real not null, primary key (namespace, key))"
+            )
+
+    def load(self, now: float):
+        with self._lock:
+            cursor = self.conn.execute(
+                "select namespace, key, value, expires_at from bot_state where expires_at > ?", (now,)
+            )
+            columns = [c[0] for c in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def save_many(self, rows):
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "insert or replace into bot_state (namespace, key, value, expires_at) "
+                "values (:namespace, :key, :value, :expires_at)", rows
+            )
+
+    def delete_expired(self, now: float):
+        with self._lock, self.conn:
+            self.conn.execute("delete from bot_state where expires_at <= ?", (now,))
+
+# --------- ВІДКЛАДЕНИЙ ЗАПИС ---------
+
+class WriteBehind:
+    """Накопичує зміни в пам'яті й записує їх пачками з фонового завдання.
+
+    Зміни одного ключа зливаються: у базу йде лише останнє значення.
+    Жодна зміна не лишається незаписаною довше за interval секунд
+    (або поки не назбирається max_batch змін)."""
+
+    def __init__(self, save_many, interval: float = 5.0, max_batch: int = 500, name: str = "стан"):
+        self.save_many = save_many
+        self.interval = interval
+        self.max_batch = max_batch
+        self.name = name
+        self.pending = {}  # ключ -> рядок для запису
+        self._wake = asyncio.Event()
+        self._task = None
+        self._stopping = False
+
+    def put(self, key, row):
+        self.pending[key] = row
+        if len(self.pending) >= self.max_batch:
+            self._wake.set()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Зупиняє фонове завдання і дописує все, що лишилося.
+
+        Завдання не скасовується: пачка, що вже пишеться в потоці, інакше
+        пропала б без повтору, якщо цей запис не вдасться."""
+        if self._task is not None:
+            self._stopping = True
+            self._wake.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            self._stopping = False
+        await self.flush()
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self):
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, {}
+        started = time.monotonic()
+        try:
+            # Синхронний клієнт бази не блокує цикл подій
+            await asyncio.to_thread(self.save_many, list(batch.values()))
+        except Exception as e:
+            print(f"❌ Помилка запису ({self.name}), {len(batch)} змін повернуто в чергу: {e}")
+            # Новіші зміни, що прийшли під час запису, мають пріоритет
+            batch.update(self.pending)
+            self.pending = batch
+            return
+        print(f"💾 Збережено {len(batch)} змін ({self.name}) за {time.monotonic() - started:.2f} с")
@@ -0,0 +1,41 @@
+import sys
+import threading
+import time
+from collections import Counter
+
+# Семплювальний профайлер для продакшну: окремий потік раз на interval
+# знімає стеки інших потоків через sys._current_frames(). Код бота не
+# змінюється й не сповільнюється, поки профілювання не запущене.
+# Результат — "згорнуті" стеки (формат flamegraph.pl / speedscope).
+
+MAX_SECONDS = 60
+_lock = threading.Lock()  # одночасно лише одне профілювання
+
+def _stack(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+def sample(seconds: float = 10, interval: float = 0.005, thread_id: int = None):
+    """Counter {згорнутий стек: кількість семплів}; None, якщо профілювання вже йде"""
+    if not _lock.acquire(blocking=False):
+        return None
+    try:
+        me = threading.get_ident()
+        stacks = Counter()
+        deadline = time.monotonic() + min(seconds, MAX_SECONDS)
+        while time.monotonic() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == me or (thread_id is not None and ident != thread_id):
+                    continue
+                stacks[_stack(frame)] += 1
+            time.sleep(interval)
+        return stacks
+    finally:
+        _lock.release()
+
+def collapsed(stacks: Counter):
+    return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()) + "\n"
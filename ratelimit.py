@@ -0,0 +1,74 @@
+import asyncio
+import time
+
+from state import ExpiringStore
+
+class TokenBucket:
+    """Токен-бакет: у середньому не більше rate подій за секунду, пікове — burst"""
+
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = rate
+        self.capacity = burst or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self):
+        """Забирає токен, якщо він є; не чекає"""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    async def acquire(self):
+        """Чекає, доки з'явиться токен"""
+        while not self.try_acquire():
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class KeyedRateLimiter:
+    """Окремий TokenBucket на кожен ключ (користувача).
+
+    Бакети неактивних ключів забуваються через idle_ttl секунд — на той
+    момент вони однаково вже повні, тож поведінка не змінюється."""
+
+    def __init__(self, rate: float, burst: float = None, idle_ttl: float = 600, maxsize: int = 100_000):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = ExpiringStore(idle_ttl, maxsize)
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def try_acquire(self, key):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.burst)
+        self._buckets[key] = bucket  # продовжує життя бакета
+        return bucket.try_acquire()
+
+class Coalescer:
+    """Однакові запити, що вже виконуються, не запускаються вдруге: усі чекають на перший"""
+
+    def __init__(self):
+        self._inflight = {}  # ключ -> Future
+
+    def __contains__(self, key):
+        return key in self._inflight
+
+    def __len__(self):
+        return len(self._inflight)
+
+    async def run(self, key, factory):
+        """Виконує factory() для key або приєднується до вже запущеного; (результат, чи_перший)"""
+        future = self._inflight.get(key)
+        first = future is None
+        if first:
+            future = self._inflight[key] = asyncio.ensure_future(factory())
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield: скасування того, хто приєднався, не скасовує спільну роботу
+        return await asyncio.shield(future), first
@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from apscheduler.jobstores.base import JobLookupError
+
+from data import get_queues, get_notify_time, queue_subscribers
+from parser import normalize_queue, upcoming_starts
+
+class Alert(NamedTuple):
+    """Одне заплановане попередження про вимкнення"""
+    user_id: int
+    queue: str
+    name: str
+    start_str: str
+    start_dt: datetime
+    notify_min: int
+
+def _schedule_key(snapshot, queue, today):
+    # Текст посту не важливий: перепланування потрібне лише при зміні інтервалів чи дати
+    key = tuple((day, snapshot.days[day][queue].intervals)
+                for day in sorted(snapshot.days) if day >= today and queue in snapshot.days[day])
+    entry = snapshot.index.get(queue)
+    if entry is not None and entry.day is None:
+        key += ((entry.intervals, entry.date_ref),)
+    return key
+
+def _queues(snapshot, today):
+    if snapshot is None:
+        return set()
+    queues = set(snapshot.index)
+    for day, day_queues in snapshot.days.items():
+        if day >= today:
+            queues.update(day_queues)
+    return queues
+
+class AlertScheduler:
+    """Точні run_once-завдання для кожного (користувач, черга, вимкнення).
+
+    Завдання перераховуються лише для черг, чий графік змінився у новому
+    знімку, та для користувачів, що змінили свої налаштування."""
+
+    def __init__(self, job_queue, callback):
+        self.job_queue = job_queue
+        self.callback = callback
+        self.snapshot = None
+        self._jobs = {}  # user_id -> {queue: [Job]}
+
+    def sync(self, snapshot, now=None):
+        """Приймає новий знімок і перепланує черги, що змінилися. Повертає їх кількість"""
+        now = now or datetime.now()
+        today = now.date()
+        old, self.snapshot = self.snapshot, snapshot
+        # Порівнюються графіки на всі відомі дні від сьогодні, а не лише останній пост
+        changed = {
+            q for q in _queues(old, today) | _queues(snapshot, today)
+            if old is None or _schedule_key(old, q, today) != _schedule_key(snapshot, q, today)
+        }
+        if not changed:
+            return 0
+
+        # Обходимо лише підписників змінених черг, а не всіх користувачів
+        for queue in changed:
+            for user_id, sub in queue_subscribers.get(queue, {}).items():
+                self._schedule(user_id, queue, sub.name, sub.notify_time, now)
+        return len(changed)
+
+    def reschedule_user(self, user_id, now=None):
+        """Викликається після зміни черг або часу сповіщення користувача"""
+        user_id = int(user_id)
+        for jobs in self._jobs.pop(user_id, {}).values():
+            self._cancel(jobs)
+        if self.snapshot is None:
+            return
+        now = now or datetime.now()
+        notify_min = get_notify_time(user_id)
+        for sub in get_queues(user_id):
+            self._schedule(user_id, normalize_queue(sub.queue), sub.name, notify_min, now)
+
+    def pending(self):
+        return sum(len(jobs) for queues in self._jobs.values() for jobs in queues.values())
+
+    def _cancel(self, jobs):
+        for job in jobs:
+            if job.removed:
+                continue
+            try:
+                job.schedule_removal()
+            except JobLookupError:
+                pass  # Завдання вже виконалося
+
+    def _schedule(self, user_id, queue, name, notify_min, now):
+        user_jobs = self._jobs.setdefault(user_id, {})
+        self._cancel(user_jobs.pop(queue, []))
+
+        jobs = []
+        # Дата кожного вимкнення відома з дня графіка, вгадувати її не треба
+        for s_str, start_dt in upcoming_starts(self.snapshot, queue, now):
+            if start_dt <= now:
+                continue
+            # Якщо момент попередження вже минув, а вимкнення ще ні — попереджаємо одразу
+            alert_at = max(start_dt - timedelta(minutes=notify_min), now)
+            alert = Alert(user_id, queue, name, s_str, start_dt, notify_min)
+            # Відносна затримка: не залежить від часового поясу планувальника
+            jobs.append(self.job_queue.run_once(
+                self._fire, when=(alert_at - now).total_seconds(),
+                data=alert, name=f"alert:{user_id}:{queue}"
+            ))
+        if jobs:
+            user_jobs[queue] = jobs
+        elif not user_jobs:
+            del self._jobs[user_id]
+
+    async def _fire(self, context):
+        alert = context.job.data
+        jobs = self._jobs.get(alert.user_id, {}).get(alert.queue)
+        if jobs and context.job in jobs:
+            jobs.remove(context.job)
+        await self.callback(context, alert)
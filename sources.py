@@ -0,0 +1,53 @@
+import json
+from typing import NamedTuple
+
+from config import CHANNEL_URL, CHANNEL_SOURCES, POLL_INTERVAL
+
+# Реєстр каналів-джерел графіків. Джерело за замовчуванням (CHANNEL_URL) має
+# порожній ключ, тож його черги лишаються як були: "4.1". Черги інших джерел
+# мають префікс ключа: "lviv:4.1".
+
+QUEUE_SEP = ":"
+
+class Source(NamedTuple):
+    key: str
+    channel: str                # https://t.me/<канал> або просто <канал>
+    poll_interval: float = POLL_INTERVAL  # секунд між перевірками каналу
+    time_pattern: str = None    # власні правила розбору; None — стандартні з parser.py
+    queue_pattern: str = None
+
+    @property
+    def page(self):
+        return f"https://t.me/s/{self.channel.rstrip('/').split('/')[-1]}"
+
+def qualify(source_key: str, queue: str):
+    """Черга джерела -> глобальний ключ черги"""
+    return f"{source_key}{QUEUE_SEP}{queue}" if source_key else queue
+
+def split_queue(queue: str):
+    """'lviv:4.1' -> ('lviv', '4.1'); '4.1' -> ('', '4.1')"""
+    source_key, _, local = queue.rpartition(QUEUE_SEP)
+    return source_key, local
+
+def _load_sources(channel_url: str = CHANNEL_URL, channel_sources: str = CHANNEL_SOURCES):
+    """CHANNEL_SOURCES — JSON-список: [{"key": "lviv", "channel": "...", "poll_interval": 600}, ...]"""
+    sources = {}
+    if channel_url or not channel_sources:
+        sources[""] = Source("", channel_url)
+    if channel_sources:
+        try:
+            for item in json.loads(channel_sources):
+                key = item["key"].strip().lower()
+                if not key or QUEUE_SEP in key:
+                    print(f"⚠️ Некоректний ключ джерела '{item['key']}', пропускаю")
+                    continue
+                sources[key] = Source(key, item["channel"], float(item.get("poll_interval", POLL_INTERVAL)),
+                                      item.get("time_pattern"), item.get("queue_pattern"))
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"❌ Помилка в CHANNEL_SOURCES: {e}")
+    if not sources:
+        # Без жодного джерела боту нічого читати, а min_poll_interval() впав би з незрозумілою помилкою
+        raise ValueError("Не задано жодного коректного джерела: вкажіть CHANNEL_URL або виправте CHANNEL_SOURCES")
+    return sources
+
+SOURCES = _load_sources()
@@ -0,0 +1,78 @@
+import json
+import time
+from collections import OrderedDict
+
+class ExpiringStore:
+    """Словник із часом життя записів і жорсткою межею розміру.
+
+    Запис живе ttl секунд від останнього оновлення. Оскільки ttl спільний,
+    порядок вставки збігається з порядком старіння, тож витіснення — це
+    просто зняття записів з початку OrderedDict за O(1) на запис."""
+
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()  # key -> (expires_at, value)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.time()
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None or entry[0] <= time.time():
+            return default
+        return entry[1]
+
+    def __setitem__(self, key, value):
+        now = time.time()
+        self._data[key] = (now + self.ttl, value)
+        self._data.move_to_end(key)
+        self.purge(now)
+
+    def pop(self, key, default=None):
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def purge(self, now: float = None):
+        """Викидає прострочені записи та найстаріші понад maxsize"""
+        now = now or time.time()
+        data = self._data
+        while data:
+            expires_at, _ = next(iter(data.values()))
+            if expires_at > now and len(data) <= self.maxsize:
+                break
+            data.popitem(last=False)
+
+class PersistentStore(ExpiringStore):
+    """ExpiringStore, кожен запис якого відкладено потрапляє в базу через WriteBehind.
+
+    Ключі — рядки, значення — будь-що, що серіалізується в JSON."""
+
+    def __init__(self, namespace: str, ttl: float, maxsize: int):
+        super().__init__(ttl, maxsize)
+        self.namespace = namespace
+        self.writer = None  # WriteBehind; підключається при запуску бота
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        if self.writer is not None:
+            expires_at, _ = self._data[key]
+            self.writer.put((self.namespace, key), {
+                "namespace": self.namespace,
+                "key": key,
+                "value": json.dumps(value),
+                "expires_at": expires_at,
+            })
+
+    def restore(self, rows):
+        """Відновлює записи з бази, зберігаючи їхній початковий термін життя"""
+        rows = sorted((r for r in rows if r["namespace"] == self.namespace), key=lambda r: r["expires_at"])
+        for row in rows:
+            self._data[row["key"]] = (row["expires_at"], json.loads(row["value"]))
+            self._data.move_to_end(row["key"])
+        self.purge()
+        return len(rows)
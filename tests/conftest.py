@@ -0,0 +1,30 @@
+import sys
+from pathlib import Path
+from types import MappingProxyType
+
+import pytest
+
+# Модулі бота лежать у корені репозиторію, як і для benchmarks/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from parser import QueueEntry, ScheduleSnapshot
+
+def schedule_snapshot(days):
+    """Знімок лише з графіками по днях: {день: {черга: інтервали}}"""
+    return ScheduleSnapshot((), 0.0, MappingProxyType({}), 0, {}, MappingProxyType({
+        day: MappingProxyType({q: QueueEntry(tuple(intervals), "", "сьогодні", day) for q, intervals in queues.items()})
+        for day, queues in days.items()
+    }))
+
+@pytest.fixture
+def clean_users(monkeypatch):
+    """Порожні users і queue_subscribers без запису в базу.
+
+    Словники очищаються, а не підміняються: scheduler і bot імпортують сам об'єкт індексу."""
+    import data
+    data.users.clear()
+    data.queue_subscribers.clear()
+    monkeypatch.setattr(data, "save_user_to_db", lambda user_id: None)
+    yield
+    data.users.clear()
+    data.queue_subscribers.clear()
@@ -0,0 +1,67 @@
+import asyncio
+import time
+
+from broadcast import Broadcaster
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append((chat_id, text))
+
+def run(messages_batches):
+    async def main():
+        bot = FakeBot()
+        broadcaster = Broadcaster(bot, workers=2, rate=1000, chat_interval=0)
+        for messages in messages_batches:
+            broadcaster.submit(messages)
+        await broadcaster.stop()
+        return bot, broadcaster
+    return asyncio.run(main())
+
+def test_same_text_is_deduplicated():
+    bot, broadcaster = run([[(1, "графік")], [(1, "графік")]])
+    assert bot.sent == [(1, "графік")]
+    assert broadcaster.stats["deduplicated"] == 1
+
+def test_explicit_key_allows_same_text_for_different_events():
+    alert = "⏰ Через 30 хв СВІТЛО БУДЕ ВИМКНЕНО!"
+    bot, broadcaster = run([[(1, alert, "1|4.1|08:00")], [(1, alert, "1|4.1|09:00")], [(1, alert, "1|4.1|09:00")]])
+    assert len(bot.sent) == 2
+    assert broadcaster.stats["deduplicated"] == 1
+
+def test_on_sent_only_for_delivered_messages():
+    from telegram.error import Forbidden
+
+    class BlockedBot(FakeBot):
+        async def send_message(self, chat_id, text, **kwargs):
+            if chat_id == 2:
+                raise Forbidden("bot was blocked by the user")
+            await super().send_message(chat_id, text)
+
+    async def main():
+        delivered = []
+        broadcaster = Broadcaster(BlockedBot(), workers=2, rate=1000, chat_interval=0)
+        broadcaster.submit([(1, "a"), (2, "b")], on_sent=delivered.append)
+        await broadcaster.stop()
+        return delivered
+
+    assert asyncio.run(main()) == [1]
+
+def test_messages_to_one_chat_are_spaced_and_ordered():
+    class TimedBot(FakeBot):
+        async def send_message(self, chat_id, text, **kwargs):
+            self.sent.append((time.monotonic(), text))
+
+    async def main():
+        bot = TimedBot()
+        broadcaster = Broadcaster(bot, workers=4, rate=1000, chat_interval=0.1)
+        broadcaster.submit([(1, f"q{i}") for i in range(1, 5)])
+        await broadcaster.stop()
+        return bot.sent
+
+    sent = asyncio.run(main())
+    assert [text for _, text in sent] == ["q1", "q2", "q3", "q4"]
+    gaps = [b - a for (a, _), (b, _) in zip(sent, sent[1:])]
+    assert all(gap >= 0.09 for gap in gaps), gaps
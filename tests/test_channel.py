@@ -0,0 +1,79 @@
+import asyncio
+
+import httpx
+import pytest
+
+import parser
+from parser import ChannelState, fetch_channel
+
+PAGE = "https://t.me/s/oblenergo"
+
+def page(*posts):
+    """Сторінка t.me/s з постами [(id, текст)]"""
+    return "".join(
+        f'<div class="tgme_widget_message" data-post="oblenergo/{post_id}">'
+        f'<div class="tgme_widget_message_text js-message_text">{text}</div></div>'
+        for post_id, text in posts
+    )
+
+class Channel:
+    """Відповіді t.me: повна сторінка з ETag, ?after= — лише новіші пости"""
+
+    def __init__(self, posts):
+        self.posts = dict(posts)
+        self.requests = []
+
+    def __call__(self, request):
+        self.requests.append(request)
+        after = request.url.params.get("after")
+        posts = [(i, t) for i, t in sorted(self.posts.items()) if after is None or i > int(after)]
+        body = page(*posts)
+        etag = f'"{hash(body):x}"'
+        if after is None and request.headers.get("If-None-Match") == etag:
+            return httpx.Response(304)
+        return httpx.Response(200, text=body, headers={"ETag": etag} if after is None else {})
+
+@pytest.fixture
+def channel(monkeypatch):
+    channel = Channel({1: "Черга 4.1: 08:00-10:00"})
+    monkeypatch.setattr(parser, "_client", httpx.AsyncClient(transport=httpx.MockTransport(channel)))
+    return channel
+
+def fetch(state):
+    return asyncio.run(fetch_channel(state))
+
+def test_full_page_then_not_modified(channel):
+    state = ChannelState(PAGE)
+    assert fetch(state)
+    assert state.texts(10) == ["Черга 4.1: 08:00-10:00"]
+    state.full_at = float("-inf")
+    assert not fetch(state)
+    assert channel.requests[-1].headers["If-None-Match"]
+    assert state.version == 1
+
+def test_incremental_fetch_merges_new_posts(channel, monkeypatch):
+    monkeypatch.setattr(parser, "FULL_REFRESH_INTERVAL", 3600)
+    state = ChannelState(PAGE)
+    fetch(state)
+    channel.posts[2] = "Черга 4.1: 12:00-14:00"
+    assert fetch(state)
+    assert channel.requests[-1].url.params["after"] == "1"
+    assert state.texts(10) == ["Черга 4.1: 08:00-10:00", "Черга 4.1: 12:00-14:00"]
+
+def test_unchanged_body_is_not_parsed_again(channel, monkeypatch):
+    monkeypatch.setattr(parser, "FULL_REFRESH_INTERVAL", 3600)
+    state = ChannelState(PAGE)
+    fetch(state)
+    parsed = []
+    monkeypatch.setattr(parser, "extract_posts", lambda html: parsed.append(html) or {})
+    assert not fetch(state)  # ?after= без нових постів — та сама порожня сторінка
+    assert not fetch(state)
+    assert len(parsed) == 1
+
+def test_edited_post_is_seen_on_the_next_check(channel):
+    state = ChannelState(PAGE)
+    fetch(state)
+    state.full_at -= parser.FULL_REFRESH_INTERVAL  # минув інтервал опитування
+    channel.posts[1] = "Черга 4.1: 09:00-11:00"
+    assert fetch(state)
+    assert state.texts(10) == ["Черга 4.1: 09:00-11:00"]
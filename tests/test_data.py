@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+import data
+from fake_supabase import FakeSupabase
+from persistence import WriteBehind
+
+pytestmark = pytest.mark.usefixtures("clean_users")
+
+# Справжня функція: clean_users підміняє її, щоб тести не писали в базу
+save_user_to_db = data.save_user_to_db
+
+def test_add_queue_rejects_same_queue_written_differently():
+    assert data.add_queue(1, "4.1", "Дім")
+    assert not data.add_queue(1, "4,1", "Дача")
+    assert [q.queue for q in data.get_queues(1)] == ["4.1"]
+
+def test_remove_queue_by_other_spelling_keeps_index_consistent():
+    data.add_queue(1, "4.1", "Дім")
+    assert data.remove_queue(1, " 4,1 ")
+    assert data.get_queues(1) == []
+    assert data.get_subscribers("4.1") == {}
+
+class BrokenClient:
+    def table(self, name):
+        raise ConnectionError("Supabase недоступний")
+
+def test_ensure_user_reports_failed_read(monkeypatch):
+    monkeypatch.setattr(data, "loaded", asyncio.Event())
+    monkeypatch.setattr(data, "_client", BrokenClient())
+    assert not asyncio.run(data.ensure_user("1"))
+    assert 1 not in data.users
+
+def test_ensure_user_reads_saved_queues(monkeypatch):
+    client = FakeSupabase()
+    client.table("users").upsert({"user_id": "1", "queues": [{"queue": "4.1", "name": "Дім"}], "notify_time": 15}).execute()
+    monkeypatch.setattr(data, "loaded", asyncio.Event())
+    monkeypatch.setattr(data, "_client", client)
+    assert asyncio.run(data.ensure_user("1"))
+    assert [q.queue for q in data.get_queues(1)] == ["4.1"]
+    assert data.get_notify_time(1) == 15
+
+def test_user_changes_are_merged_and_upserted_in_chunks(monkeypatch):
+    client = FakeSupabase()
+    monkeypatch.setattr(data, "_client", client)
+    monkeypatch.setattr(data, "UPSERT_CHUNK", 2)  # три рядки — два запити
+    writer = WriteBehind(data._upsert_users, interval=60)
+    monkeypatch.setattr(data, "user_writer", writer)
+
+    for uid in range(1, 4):
+        data.add_queue(uid, "4.1", "Дім")
+        save_user_to_db(uid)
+    data.set_notify_time(1, 15)
+    save_user_to_db(1)  # друга зміна того самого користувача зливається з першою
+    assert len(writer.pending) == 3
+
+    asyncio.run(writer.stop())
+    rows = {row["user_id"]: row for row in client.tables["users"].rows.values()}
+    assert sorted(rows) == ["1", "2", "3"]
+    assert rows["1"]["notify_time"] == 15
+    assert rows["2"]["queues"] == [{"queue": "4.1", "name": "Дім"}]
+
+def fake_users(count):
+    client = FakeSupabase()
+    client.table("users").upsert([
+        {"user_id": str(uid), "queues": [{"queue": "4,1" if uid % 2 else "2", "name": "Дім"}], "notify_time": None}
+        for uid in range(1, count + 1)
+    ]).execute()
+    return client
+
+def test_load_data_reads_all_pages_into_index(monkeypatch):
+    monkeypatch.setattr(data, "loaded", asyncio.Event())
+    monkeypatch.setattr(data, "_client", fake_users(5))
+    asyncio.run(data.load_data_async(page_size=2))
+    assert data.loaded.is_set()
+    assert sorted(data.users) == [1, 2, 3, 4, 5]
+    assert sorted(data.get_subscribers("4.1")) == [1, 3, 5]
+    assert data.get_notify_time(2) == data.DEFAULT_NOTIFY_TIME
+
+def test_load_data_retries_failed_page_before_marking_loaded(monkeypatch):
+    monkeypatch.setattr(data, "loaded", asyncio.Event())
+    monkeypatch.setattr(data, "_client", fake_users(5))
+    monkeypatch.setattr(data, "LOAD_RETRY_DELAYS", (0,))
+    fetch_page = data._fetch_page
+    seen = {}
+
+    def flaky_fetch(start, page_size):
+        assert not data.loaded.is_set()
+        seen[start] = seen.get(start, 0) + 1
+        if start == 4 and seen[start] < 3:
+            raise ConnectionError("Supabase недоступний")
+        return fetch_page(start, page_size)
+
+    monkeypatch.setattr(data, "_fetch_page", flaky_fetch)
+    asyncio.run(data.load_data_async(page_size=2))
+    assert seen == {0: 1, 2: 1, 4: 3}
+    assert data.loaded.is_set()
+    assert [q.queue for q in data.get_queues(5)] == ["4,1"]
@@ -0,0 +1,101 @@
+import asyncio
+from datetime import date, datetime, timedelta
+
+from conftest import schedule_snapshot as snapshot
+from extractor import Post
+from parser import ScheduleStore, calculate_stats, diff_intervals, get_timeline, index_post
+
+TODAY = date.today()
+YESTERDAY = TODAY - timedelta(days=1)
+TOMORROW = TODAY + timedelta(days=1)
+
+def stats(snap, queue="4.1"):
+    return asyncio.run(calculate_stats(queue, snap))
+
+def test_stats_ignore_next_day_span_joined_at_midnight():
+    snap = snapshot({
+        TODAY: {"4.1": [("08:00", "10:00"), ("20:00", "24:00")]},
+        TOMORROW: {"4.1": [("00:00", "04:00")]},
+    })
+    result = stats(snap)
+    assert result["total_off"] == "6 год 0 хв"
+    assert result["num_outages"] == 2
+
+def test_stats_ignore_previous_day_span_joined_at_midnight():
+    snap = snapshot({
+        YESTERDAY: {"4.1": [("20:00", "24:00")]},
+        TODAY: {"4.1": [("00:00", "02:00"), ("10:00", "12:00")]},
+    })
+    result = stats(snap)
+    assert result["total_off"] == "4 год 0 хв"
+    assert result["num_outages"] == 2
+
+def test_timeline_still_spans_midnight_for_status():
+    snap = snapshot({
+        TODAY: {"4.1": [("20:00", "24:00")]},
+        TOMORROW: {"4.1": [("00:00", "04:00")]},
+    })
+    now = datetime.combine(TODAY, datetime.min.time()) + timedelta(hours=21)
+    timeline = get_timeline(snap, "4.1", now)
+    assert timeline.is_off(now)
+    assert timeline.next_change(now)[1] == "04:00"
+
+def test_index_post_takes_queue_only_from_line_label():
+    text = "Черга 4.1: 08:00-10:00 (2 год), 14:00-16:00\nЧерга 2: 10:00-12:00"
+    index = index_post(text)
+    assert index["4.1"].intervals == (("08:00", "10:00"), ("14:00", "16:00"))
+    assert index["2"].intervals == (("10:00", "12:00"),)
+
+def test_index_post_reads_several_queues_before_intervals():
+    index = index_post("Черги 1.1, 1.2: 8:00-10:00")
+    assert index["1.1"].intervals == index["1.2"].intervals == (("08:00", "10:00"),)
+
+def test_stats_count_adjacent_intervals_separately():
+    result = stats(snapshot({TODAY: {"4.1": [("08:00", "10:00"), ("10:00", "12:00")]}}))
+    assert result["num_outages"] == 2
+    assert result["total_off"] == "4 год 0 хв"
+
+def published(day):
+    return f"{day.isoformat()}T07:00:00"
+
+def test_schedule_store_newest_post_wins_and_edits_are_retracted():
+    store = ScheduleStore()
+    posts = {
+        1: Post("Графік на сьогодні\nЧерга 4.1: 08:00-10:00\nЧерга 2: 12:00-14:00", published(TODAY)),
+        2: Post("Оновлення на сьогодні\nЧерга 4.1: 09:00-11:00", published(TODAY)),
+    }
+    assert store.apply(posts, TODAY) == {TODAY}
+    view = store.view()[TODAY]
+    assert view["4.1"].intervals == (("09:00", "11:00"),)
+    assert view["2"].intervals == (("12:00", "14:00"),)
+
+    # Редагування прибирає чергу 4.1 з новішого посту: діє знову старіший
+    posts[2] = Post("Оновлення на сьогодні\nЧерга 2: 15:00-16:00", published(TODAY))
+    assert store.apply(posts, TODAY) == {TODAY}
+    view = store.view()[TODAY]
+    assert view["4.1"].intervals == (("08:00", "10:00"),)
+    assert view["2"].intervals == (("15:00", "16:00"),)
+    assert store.apply(posts, TODAY) == set()
+
+def test_schedule_store_keeps_history_after_post_leaves_page():
+    store = ScheduleStore(keep_days=1)
+    store.apply({1: Post("Черга 4.1: 08:00-10:00", published(YESTERDAY))}, TODAY)
+    store.apply({2: Post("Черга 4.1: 10:00-12:00", published(TODAY))}, TODAY)
+    assert set(store.view()) == {YESTERDAY, TODAY}
+    store.apply({}, TOMORROW)
+    assert set(store.view()) == {TODAY}
+
+def test_diff_intervals_treats_overlap_as_shift():
+    diff = diff_intervals([("08:00", "10:00"), ("14:00", "16:00")], [("09:00", "11:00"), ("20:00", "22:00")])
+    assert diff.shifted == ((("08:00", "10:00"), ("09:00", "11:00")),)
+    assert diff.removed == (("14:00", "16:00"),)
+    assert diff.added == (("20:00", "22:00"),)
+    assert not diff_intervals([("08:00", "10:00")], [("08:00", "10:00")]).changed
+
+def test_dotted_times_are_not_taken_for_a_date():
+    published_at = f"{TODAY.isoformat()}T07:00:00"
+    assert index_post("Графік на завтра\nЧерга 4.1: 08.00-10.00", published_at)["4.1"].day == TOMORROW
+    entry = index_post("Графік на сьогодні\nЧерга 4.1: 12.10-14.00", published_at)["4.1"]
+    assert entry.day == TODAY
+    assert entry.intervals == (("12:10", "14:00"),)
+    assert index_post("Графік на 18.10\nЧерга 4.1: 08.00-10.00")["4.1"].date_ref == (18, 10)
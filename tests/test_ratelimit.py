@@ -0,0 +1,70 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import bot
+from ratelimit import Coalescer, KeyedRateLimiter
+from state import ExpiringStore
+
+def test_keyed_rate_limiter_limits_each_key_separately():
+    limiter = KeyedRateLimiter(rate=0.001, burst=2)
+    assert [limiter.try_acquire(1) for _ in range(3)] == [True, True, False]
+    assert limiter.try_acquire(2)
+    assert len(limiter) == 2
+
+def test_coalescer_runs_same_key_once():
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "графік"
+
+    async def main():
+        coalescer = Coalescer()
+        results = await asyncio.gather(*(coalescer.run("k", work) for _ in range(3)))
+        return results, len(coalescer)
+
+    results, inflight = asyncio.run(main())
+    assert calls == [1]
+    assert sorted(first for _, first in results) == [False, False, True]
+    assert {value for value, _ in results} == {"графік"}
+    assert inflight == 0
+
+class Message:
+    def __init__(self):
+        self.replies = []
+
+    async def reply_text(self, text, **kwargs):
+        self.replies.append(text)
+
+def update(user_id=1):
+    return SimpleNamespace(effective_user=SimpleNamespace(id=user_id), message=Message())
+
+@pytest.fixture
+def limits(monkeypatch):
+    monkeypatch.setattr(bot, "user_limiter", KeyedRateLimiter(rate=0.001, burst=2))
+    monkeypatch.setattr(bot, "user_requests", Coalescer())
+    monkeypatch.setattr(bot, "throttle_warned", ExpiringStore(ttl=30, maxsize=100))
+
+def test_interactive_coalesces_taps_and_throttles_once(limits):
+    handled = []
+
+    async def handler(upd, context):
+        handled.append(upd)
+        await asyncio.sleep(0.01)
+
+    async def main():
+        taps = [update() for _ in range(3)]
+        # Три натискання поки відповідь готується — один виклик обробника
+        await asyncio.gather(*(bot.interactive(u, None, "check", handler) for u in taps))
+        later = [update() for _ in range(3)]
+        for u in later:
+            await bot.interactive(u, None, "check", handler)
+        return later
+
+    later = asyncio.run(main())
+    # Запас burst=2: друга серія — ще один виклик, далі ліміт і лише одне попередження
+    assert len(handled) == 2
+    assert [m.message.replies for m in later] == [[], ["⏳ Забагато запитів. Спробуй за кілька секунд."], []]
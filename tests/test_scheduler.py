@@ -0,0 +1,85 @@
+import asyncio
+from datetime import date, datetime
+from types import SimpleNamespace
+
+import pytest
+
+import data
+from conftest import schedule_snapshot
+from scheduler import AlertScheduler
+
+DAY = date(2026, 10, 18)
+NOW = datetime(2026, 10, 18, 7, 0)
+
+class FakeJob:
+    def __init__(self, callback, when, data):
+        self.callback = callback
+        self.when = when
+        self.data = data
+        self.removed = False
+
+    def schedule_removal(self):
+        self.removed = True
+
+class FakeJobQueue:
+    def __init__(self):
+        self.jobs = []
+
+    def run_once(self, callback, when, data=None, name=None):
+        job = FakeJob(callback, when, data)
+        self.jobs.append(job)
+        return job
+
+    def active(self):
+        return [job for job in self.jobs if not job.removed]
+
+def snapshot(queues):
+    return schedule_snapshot({DAY: queues})
+
+pytestmark = pytest.mark.usefixtures("clean_users")
+
+@pytest.fixture
+def scheduler():
+    fired = []
+
+    async def callback(context, alert):
+        fired.append(alert)
+
+    scheduler = AlertScheduler(FakeJobQueue(), callback)
+    scheduler.fired = fired
+    return scheduler
+
+def test_sync_schedules_alerts_before_each_future_outage(scheduler):
+    data.add_queue(1, "4.1", "Дім")
+    data.set_notify_time(1, 30)
+    assert scheduler.sync(snapshot({"4.1": [("06:00", "07:00"), ("08:00", "10:00"), ("07:10", "08:00")]}), NOW) == 1
+    jobs = scheduler.job_queue.active()
+    # 06:00 уже минуло, про 07:10 попереджаємо одразу, про 08:00 — за 30 хв
+    assert sorted(job.when for job in jobs) == [0, 1800]
+    assert scheduler.pending() == 2
+
+def test_sync_reschedules_only_changed_queues(scheduler):
+    data.add_queue(1, "4.1", "Дім")
+    data.add_queue(2, "2", "Робота")
+    scheduler.sync(snapshot({"4.1": [("08:00", "10:00")], "2": [("12:00", "14:00")]}), NOW)
+    first = list(scheduler.job_queue.jobs)
+
+    assert scheduler.sync(snapshot({"4.1": [("09:00", "10:00")], "2": [("12:00", "14:00")]}), NOW) == 1
+    assert {job.data.queue: job.removed for job in first} == {"4.1": True, "2": False}
+    assert scheduler.pending() == 2
+
+def test_reschedule_user_after_queue_removed(scheduler):
+    data.add_queue(1, "4.1", "Дім")
+    scheduler.sync(snapshot({"4.1": [("08:00", "10:00")]}), NOW)
+    data.remove_queue(1, "4.1")
+    scheduler.reschedule_user(1, NOW)
+    assert scheduler.pending() == 0
+    assert scheduler.job_queue.active() == []
+
+def test_fired_job_is_forgotten(scheduler):
+    data.add_queue(1, "4.1", "Дім")
+    scheduler.sync(snapshot({"4.1": [("08:00", "10:00")]}), NOW)
+    job = scheduler.job_queue.jobs[0]
+    asyncio.run(job.callback(SimpleNamespace(job=job)))
+    assert [alert.start_str for alert in scheduler.fired] == ["08:00"]
+    assert scheduler.pending() == 0
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+import parser
+from extractor import Post
+from parser import SourceFeed
+from sources import Source, _load_sources
+
+class SlowChannel:
+    """Замість get_last_posts: рахує запити й відповідає із затримкою"""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = 0
+        self.text = {}  # назва каналу -> текст посту
+
+    async def __call__(self, limit=10, state=None):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        state.merge({1: Post(self.text.get(state.name, "Черга 4.1: 08:00-10:00"))})
+        return state.texts(limit)
+
+@pytest.fixture
+def slow_channel(monkeypatch):
+    channel = SlowChannel()
+    monkeypatch.setattr(parser, "get_last_posts", channel)
+    return channel
+
+def test_concurrent_callers_share_one_fetch(slow_channel):
+    feed = SourceFeed(Source("", "oblenergo"))
+
+    async def main():
+        return await asyncio.gather(*(feed.get_snapshot(max_age=0) for _ in range(5)))
+
+    snapshots = asyncio.run(main())
+    assert slow_channel.calls == 1
+    assert all(s is snapshots[0] for s in snapshots)
+    assert snapshots[0].index["4.1"].intervals == (("08:00", "10:00"),)
+
+def test_fresh_snapshot_is_served_from_cache(slow_channel):
+    feed = SourceFeed(Source("", "oblenergo"))
+
+    async def main():
+        first = await feed.get_snapshot(max_age=60)
+        return first, await feed.get_snapshot(max_age=60)
+
+    first, second = asyncio.run(main())
+    assert second is first
+    assert slow_channel.calls == 1
+
+def test_sources_merge_under_qualified_queue_keys(slow_channel, monkeypatch):
+    slow_channel.delay = 0
+    slow_channel.text = {"lviv": "Черга 2.2: 10:00-12:00"}
+    feeds = {"": SourceFeed(Source("", "oblenergo")), "lviv": SourceFeed(Source("lviv", "lvivoblenergo"))}
+    monkeypatch.setattr(parser, "_feeds", feeds)
+    monkeypatch.setattr(parser, "_merged", ((), None))
+
+    async def main():
+        first = await parser.get_snapshot(max_age=0)
+        return first, await parser.get_snapshot(max_age=60)
+
+    first, second = asyncio.run(main())
+    assert first.index["4.1"].intervals == (("08:00", "10:00"),)
+    assert first.index["lviv:2.2"].intervals == (("10:00", "12:00"),)
+    assert "2.2" not in first.index
+    # Джерела не змінилися — зведений знімок не перебудовується
+    assert second.index is first.index
+
+def test_slow_source_falls_back_to_previous_snapshot(slow_channel, monkeypatch):
+    feed = SourceFeed(Source("lviv", "lvivoblenergo"))
+    monkeypatch.setattr(parser, "SOURCE_WAIT_TIMEOUT", 0.01)
+
+    async def main():
+        slow_channel.delay = 0
+        previous = await feed.get_snapshot(max_age=0)
+        slow_channel.delay = 0.2
+        slow_channel.text = {"lviv": "Черга 4.1: 09:00-11:00"}
+        served = await feed.get_snapshot_or_stale(max_age=0)
+        await feed.inflight  # запит не скасовано, він завершується у фоні
+        return previous, served, feed.snapshot
+
+    previous, served, refreshed = asyncio.run(main())
+    assert served is previous
+    assert refreshed.index["4.1"].intervals == (("09:00", "11:00"),)
+
+def test_no_valid_source_is_a_config_error():
+    with pytest.raises(ValueError, match="CHANNEL_SOURCES"):
+        _load_sources("", "не json")
+    with pytest.raises(ValueError):
+        _load_sources("", '[{"key": "a:b", "channel": "x"}]')
+    assert set(_load_sources("", '[{"key": "Lviv", "channel": "x"}]')) == {"lviv"}
@@ -0,0 +1,122 @@
+import asyncio
+import threading
+
+import pytest
+
+from fake_supabase import FakeSupabase
+from persistence import PAGE_SIZE, SqliteStateBackend, SupabaseStateBackend, WriteBehind
+from state import ExpiringStore, PersistentStore
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("state.time.time", clock)
+    return clock
+
+def test_expiring_store_forgets_old_entries(clock):
+    store = ExpiringStore(ttl=10, maxsize=100)
+    store["a"] = 1
+    clock.now += 5
+    store["b"] = 2
+    clock.now += 6
+    assert "a" not in store and store.get("a") is None
+    assert store.get("b") == 2
+    store.purge()
+    assert len(store) == 1
+
+def test_expiring_store_evicts_oldest_over_maxsize(clock):
+    store = ExpiringStore(ttl=10, maxsize=2)
+    store["a"] = 1
+    store["b"] = 2
+    store["a"] = 3  # оновлення робить запис наймолодшим
+    store["c"] = 4
+    assert "b" not in store
+    assert store.get("a") == 3 and store.get("c") == 4
+
+def save_and_restore(backend, clock):
+    """Записує стан через WriteBehind і відновлює його в нове сховище"""
+    async def main():
+        store = PersistentStore("sent_notifications", ttl=60, maxsize=100)
+        store.writer = WriteBehind(backend.save_many, interval=60)
+        store["1|4.1|2026-10-18T08:00"] = True
+        store["1|4.1|2026-10-18T08:00"] = True  # зміни одного ключа зливаються
+        store["2|4.1|2026-10-18T08:00"] = True
+        assert len(store.writer.pending) == 2
+        await store.writer.stop()
+    asyncio.run(main())
+
+    restored = PersistentStore("sent_notifications", ttl=60, maxsize=100)
+    other = PersistentStore("last_schedule", ttl=60, maxsize=100)
+    rows = backend.load(clock.now)
+    assert restored.restore(rows) == 2
+    assert other.restore(rows) == 0
+    assert "1|4.1|2026-10-18T08:00" in restored
+
+    backend.delete_expired(clock.now + 61)
+    assert backend.load(clock.now) == []
+
+def test_state_roundtrip_sqlite(clock):
+    save_and_restore(SqliteStateBackend(), clock)
+
+def test_state_roundtrip_supabase(clock):
+    save_and_restore(SupabaseStateBackend(FakeSupabase()), clock)
+
+def test_write_behind_keeps_failed_batch():
+    saved = []
+
+    def save_many(rows):
+        if not saved:
+            saved.append(None)
+            raise ConnectionError("база недоступна")
+        saved.append(rows)
+
+    async def main():
+        writer = WriteBehind(save_many, interval=60)
+        writer.put("a", {"v": 1})
+        await writer.flush()
+        writer.put("a", {"v": 2})  # новіша зміна під час збою має пріоритет
+        await writer.flush()
+        return writer
+
+    writer = asyncio.run(main())
+    assert saved[1:] == [[{"v": 2}]]
+    assert writer.pending == {}
+
+def test_write_behind_stop_waits_for_save_in_progress():
+    started, release = threading.Event(), threading.Event()
+    saved = []
+
+    def save_many(rows):
+        if not started.is_set():
+            started.set()
+            release.wait(5)
+            raise ConnectionError("база недоступна")
+        saved.extend(rows)
+
+    async def main():
+        writer = WriteBehind(save_many, interval=60, max_batch=1)
+        writer.start()
+        writer.put("a", {"v": 1})
+        await asyncio.to_thread(started.wait, 5)
+        stopping = asyncio.create_task(writer.stop())
+        await asyncio.sleep(0.05)
+        release.set()  # запис, що йшов під час зупинки, не вдався — його треба повторити
+        await stopping
+
+    asyncio.run(main())
+    assert saved == [{"v": 1}]
+
+def test_supabase_backend_reads_every_page(clock):
+    client = FakeSupabase()
+    rows = [{"namespace": "n", "key": f"{i:05d}", "value": "true", "expires_at": clock.now + 60}
+            for i in range(PAGE_SIZE + 5)]
+    client.table("bot_state").upsert(list(reversed(rows))).execute()
+    loaded = SupabaseStateBackend(client).load(clock.now)
+    assert [row["key"] for row in loaded] == [row["key"] for row in rows]
@@ -0,0 +1,39 @@
+from datetime import date, datetime
+
+from timeline import Timeline, minutes_label
+
+DAY = date(2026, 10, 18)
+NEXT_DAY = date(2026, 10, 19)
+
+def at(day, hh, mm=0):
+    return datetime(day.year, day.month, day.day, hh, mm)
+
+def test_empty_timeline():
+    timeline = Timeline.build([(DAY, [])])
+    assert not timeline
+    assert timeline.next_change(at(DAY, 12)) is None
+
+def test_is_off_and_next_change():
+    timeline = Timeline.build([(DAY, [("08:00", "10:00"), ("14:00", "16:00")])])
+    assert not timeline.is_off(at(DAY, 7, 59))
+    assert timeline.is_off(at(DAY, 8))
+    assert not timeline.is_off(at(DAY, 10))
+    assert timeline.next_change(at(DAY, 9))[1:] == ("10:00", True)
+    assert timeline.next_change(at(DAY, 11))[1:] == ("14:00", False)
+    assert timeline.next_change(at(DAY, 17)) is None
+
+def test_overnight_interval_ends_next_day():
+    timeline = Timeline.build([(DAY, [("22:00", "02:00")])])
+    assert timeline.is_off(at(NEXT_DAY, 1))
+    moment, label, light_on = timeline.next_change(at(DAY, 23))
+    assert (moment, label, light_on) == (at(NEXT_DAY, 2), "02:00", True)
+    assert timeline.total_off_minutes(DAY) == 240
+
+def test_overlapping_intervals_are_merged():
+    timeline = Timeline.build([(DAY, [("08:00", "11:00"), ("10:00", "12:00"), ("bad", "12:00")])])
+    assert timeline.total_off_minutes() == 240
+    assert timeline.next_change(at(DAY, 9))[1] == "12:00"
+
+def test_minutes_label_shows_midnight_end_as_24():
+    assert minutes_label(1440, is_end=True) == "24:00"
+    assert minutes_label(1440) == "00:00"
@@ -0,0 +1,56 @@
+import asyncio
+
+import web
+from web import Response, WebServer
+
+def exchange(raw: bytes):
+    """Надсилає сирий запит серверу на випадковому порту; повертає (статус, тіло, запити)"""
+    async def main():
+        server = WebServer("127.0.0.1", 0)
+        seen = []
+
+        @server.route("/echo", method="POST")
+        async def echo(request):
+            seen.append(request)
+            return Response(200, request.body.decode())
+
+        @server.route("/boom")
+        async def boom(request):
+            raise RuntimeError("boom")
+
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(raw)
+            await writer.drain()
+            answer = await reader.read()
+            writer.close()
+        finally:
+            await server.stop()
+        head, _, body = answer.partition(b"\r\n\r\n")
+        return int(head.split()[1]), body.decode(), seen
+    return asyncio.run(main())
+
+def test_post_with_body_and_query():
+    body = '{"update_id": 1}'.encode()
+    status, text, seen = exchange(
+        b"POST /echo?token=abc&x=1&x=2 HTTP/1.1\r\nHost: x\r\nX-Telegram-Bot-Api-Secret-Token: s\r\n"
+        b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body
+    )
+    assert (status, text) == (200, '{"update_id": 1}')
+    request = seen[0]
+    assert request.query == {"token": "abc", "x": "1"}
+    assert request.headers["x-telegram-bot-api-secret-token"] == "s"
+
+def test_unknown_path_and_wrong_method():
+    assert exchange(b"GET /nope HTTP/1.1\r\n\r\n")[0] == 404
+    assert exchange(b"GET /echo HTTP/1.1\r\n\r\n")[0] == 405
+
+def test_malformed_and_oversized_requests():
+    assert exchange(b"GARBAGE\r\n\r\n")[0] == 400
+    assert exchange(b"POST /echo HTTP/1.1\r\nContent-Length: abc\r\n\r\n")[0] == 400
+    too_big = str(web.MAX_BODY + 1).encode()
+    assert exchange(b"POST /echo HTTP/1.1\r\nContent-Length: " + too_big + b"\r\n\r\n")[0] == 413
+
+def test_handler_error_is_500():
+    assert exchange(b"GET /boom HTTP/1.1\r\n\r\n")[0] == 500
@@ -0,0 +1,95 @@
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+
+DAY = 1440  # хвилин у добі
+
+def to_minutes(t_str: str):
+    """'HH:MM' -> хвилини від початку доби ('24:00' -> 1440)"""
+    h, m = map(int, t_str.split(":"))
+    return h * 60 + m
+
+def minutes_label(minutes: int, is_end: bool = False):
+    """Зворотне перетворення; кінець рівно опівночі показуємо як 24:00"""
+    minutes %= DAY
+    if is_end and minutes == 0:
+        return "24:00"
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+class Timeline:
+    """Відрізки без світла як відсортовані хвилини від півночі базового дня.
+
+    Інтервали через північ ('22:00-02:00') розгорнуті в один відрізок,
+    дні (сьогодні, завтра) зведені на одну вісь, перекриття злиті. Запити
+    "чи є світло", "коли наступна зміна" — бінарний пошук по starts."""
+
+    __slots__ = ("base", "starts", "ends")
+
+    def __init__(self, base: date, starts, ends):
+        self.base = base
+        self.starts = starts
+        self.ends = ends
+
+    @classmethod
+    def build(cls, days):
+        """days: [(дата, [("HH:MM", "HH:MM"), ...]), ...]"""
+        days = [(d, intervals) for d, intervals in days if intervals]
+        if not days:
+            return cls(date.today(), [], [])
+        base = min(d for d, _ in days)
+
+        spans = []
+        for day, intervals in days:
+            offset = (day - base).days * DAY
+            for s_str, e_str in intervals:
+                try:
+                    start, end = to_minutes(s_str), to_minutes(e_str)
+                except ValueError:
+                    continue
+                if end <= start:
+                    end += DAY  # Перехід через ніч
+                spans.append((offset + start, offset + end))
+        spans.sort()
+
+        starts, ends = [], []
+        for start, end in spans:
+            if ends and start <= ends[-1]:
+                ends[-1] = max(ends[-1], end)
+            else:
+                starts.append(start)
+                ends.append(end)
+        return cls(base, starts, ends)
+
+    def __bool__(self):
+        return bool(self.starts)
+
+    def _offset(self, now: datetime):
+        return (now - datetime.combine(self.base, datetime.min.time())).total_seconds() / 60
+
+    def _at(self, minutes: int):
+        return datetime.combine(self.base, datetime.min.time()) + timedelta(minutes=minutes)
+
+    def _find(self, t: float):
+        """Індекс останнього відрізка, що почався не пізніше t (або -1)"""
+        return bisect_right(self.starts, t) - 1
+
+    def is_off(self, now: datetime):
+        i = self._find(self._offset(now))
+        return i >= 0 and self._offset(now) < self.ends[i]
+
+    def next_change(self, now: datetime):
+        """(момент, 'HH:MM', світло_з'явиться) найближчої зміни або None"""
+        t = self._offset(now)
+        i = self._find(t)
+        if i >= 0 and t < self.ends[i]:
+            return self._at(self.ends[i]), minutes_label(self.ends[i], is_end=True), True
+        if i + 1 < len(self.starts):
+            return self._at(self.starts[i + 1]), minutes_label(self.starts[i + 1]), False
+        return None
+
+    def total_off_minutes(self, day: date = None):
+        """Хвилини без світла за відрізками, що починаються в день day (або всі)"""
+        if day is None:
+            return sum(e - s for s, e in zip(self.starts, self.ends))
+        lo = (day - self.base).days * DAY
+        i, j = bisect_right(self.starts, lo - 1), bisect_right(self.starts, lo + DAY - 1)
+        return sum(self.ends[k] - self.starts[k] for k in range(i, j))
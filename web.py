@@ -0,0 +1,105 @@
+import asyncio
+from typing import NamedTuple
+from urllib.parse import parse_qs, urlsplit
+
+# Мінімальний HTTP/1.1-сервер на asyncio для health-check, /metrics і вебхука.
+# Працює на тому ж циклі подій, що й Application: жодних окремих потоків.
+# Кожне з'єднання обслуговує один запит і закривається.
+
+MAX_BODY = 1 << 20    # байт: оновлення Telegram значно менші
+READ_TIMEOUT = 10     # секунд на заголовки й тіло запиту
+
+REASONS = {200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found",
+           405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+class Request(NamedTuple):
+    method: str
+    path: str
+    query: dict   # ім'я -> перше значення
+    headers: dict # ключі в нижньому регістрі
+    body: bytes
+
+class Response(NamedTuple):
+    status: int = 200
+    body: str = ""
+    content_type: str = "text/plain; charset=utf-8"
+
+class WebServer:
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._routes = {}  # (метод, шлях) -> async handler(Request) -> Response
+        self._server = None
+
+    def route(self, path: str, method: str = "GET"):
+        def decorator(handler):
+            self._routes[(method, path)] = handler
+            return handler
+        return decorator
+
+    async def start(self):
+        if self._server is None:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+            self.port = self._server.sockets[0].getsockname()[1]  # якщо port=0
+            print(f"🌐 HTTP-сервер слухає {self.host}:{self.port}")
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader, writer):
+        try:
+            try:
+                request = await asyncio.wait_for(self._read_request(reader), READ_TIMEOUT)
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, UnicodeDecodeError):
+                response = Response(400, "Некоректний запит")
+            else:
+                response = await self._dispatch(request) if request is not None else Response(413, "Завеликий запит")
+            await self._write(writer, response)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        request_line = (await reader.readuntil(b"\r\n")).decode("latin-1").split()
+        if len(request_line) != 3:
+            raise ValueError("request line")
+        method, target, _ = request_line
+        headers = {}
+        while True:
+            line = (await reader.readuntil(b"\r\n")).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0))
+        if length > MAX_BODY:
+            return None
+        body = await reader.readexactly(length) if length else b""
+        url = urlsplit(target)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        return Request(method.upper(), url.path, query, headers, body)
+
+    async def _dispatch(self, request):
+        handler = self._routes.get((request.method, request.path))
+        if handler is None:
+            if any(path == request.path for _, path in self._routes):
+                return Response(405, "Метод не підтримується")
+            return Response(404, "Не знайдено")
+        try:
+            return await handler(request)
+        except Exception as e:
+            print(f"[Web Error] {request.method} {request.path}: {e}")
+            return Response(500, "Внутрішня помилка")
+
+    async def _write(self, writer, response):
+        body = response.body.encode()
+        head = (f"HTTP/1.1 {response.status} {REASONS.get(response.status, '')}\r\n"
+                f"Content-Type: {response.content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()